@@ -1,5 +1,6 @@
-from bilby.core.utils import logger
-from logging import ERROR
-
-logger.setLevel(ERROR)
+import logging
 
+# Silence bilby below ERROR without importing it: heavy dependencies are only
+# imported on first use, and bilby resets its logger's level when imported,
+# so a filter is used rather than setLevel.
+logging.getLogger("bilby").addFilter(lambda record: record.levelno >= logging.ERROR)
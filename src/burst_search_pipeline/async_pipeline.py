@@ -0,0 +1,352 @@
+"""
+Asynchronous producer/consumer pipeline overlapping data generation with training.
+
+Worker processes call a ``produce(index)`` function (e.g. a
+:class:`TrainingBatchProducer`) to build minibatches of numpy arrays. Each
+batch is written into a free slot of a
+:class:`~burst_search_pipeline.shared_batch.SharedBatchPool` and announced
+on a queue, so only a small header is pickled. The consumer iterates over
+the batches in index order in the main process, reading each one through
+zero-copy views of its slot. It trains or scores while the workers build
+the next ones::
+
+    producer = TrainingBatchProducer(seed=0, batch_size=1024)
+    with AsyncPipeline(producer, n_batches=64, n_workers=4) as pipeline:
+        for batch in pipeline:
+            train_step(batch['strain'], batch['labels'])
+    print(pipeline.stats.summary())
+
+Backpressure: the pool has ``max_pending + 1`` slots, one for the batch
+being consumed. A batch is only started once a slot is free, so a slow
+consumer bounds the memory the workers use. Leaving the loop early, an
+exception in the consumer, or an exception in a producer shuts the workers
+down and frees the pool.
+"""
+
+import multiprocessing
+import queue
+import time
+import traceback
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .precision import PRECISIONS, get_precision
+from .precision import precision as precision_context
+from .qtransform import QTransformEngine
+from .shared_batch import BatchLayout, SharedBatchPool
+from .training_data import (
+    LABEL_PROBABILITIES,
+    N_IFOS,
+    PARAMETER_NAMES,
+    compute_qgrams,
+    generate_training_set,
+)
+from .waveform_generator import N_TIMESTAMPS
+
+Batch = Dict[str, np.ndarray]
+
+
+@dataclass
+class PipelineStats:
+    """Per-stage times of an :class:`AsyncPipeline` run"""
+
+    n_batches: int = 0
+    n_items: int = 0  # rows (leading dimension) of the consumed batches
+    produce_seconds: float = 0.0  # summed over the workers
+    # summed over the workers, copying batches into their slots
+    transfer_seconds: float = 0.0
+    wait_seconds: float = 0.0  # consumer blocked on batches that were not ready
+    consume_seconds: float = 0.0  # consumer work between batches
+    wall_seconds: float = 0.0
+    n_workers: int = 1
+
+    @property
+    def produce_throughput(self) -> float:
+        """items / s of all the workers together, had they been kept busy"""
+        return (
+            self.n_workers * self.n_items / self.produce_seconds
+            if self.produce_seconds
+            else 0.0
+        )
+
+    @property
+    def consume_throughput(self) -> float:
+        """items / s of the consumer alone"""
+        return self.n_items / self.consume_seconds if self.consume_seconds else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """items / s end to end"""
+        return self.n_items / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def hidden_fraction(self) -> float:
+        """Fraction of the (per-worker) production time the consumer did not wait for"""
+        produce_wall = self.produce_seconds / self.n_workers
+        return 1 - min(self.wait_seconds / produce_wall, 1.0) if produce_wall else 0.0
+
+    def summary(self) -> dict:
+        return dict(
+            asdict(self),
+            produce_throughput=self.produce_throughput,
+            consume_throughput=self.consume_throughput,
+            throughput=self.throughput,
+            hidden_fraction=self.hidden_fraction,
+        )
+
+
+@dataclass
+class TrainingBatchProducer:
+    """
+    ``produce(index)`` for :class:`AsyncPipeline`: batch ``index`` of a training set.
+
+    Batch ``i`` holds samples ``[i * batch_size, (i + 1) * batch_size)`` of
+    :func:`training_data.generate_training_set`, so the batches do not
+    depend on the number of workers. Qgrams are added if a ``qgram_engine``
+    is given. The :mod:`precision` is captured when the producer is built
+    and used in the workers.
+    """
+
+    seed: int = 0
+    batch_size: int = 256
+    label_probabilities: Sequence[float] = LABEL_PROBABILITIES
+    qgram_engine: Optional[QTransformEngine] = None
+    precision: str = field(default_factory=get_precision)
+
+    def layout(self) -> BatchLayout:
+        fields = dict(
+            strain=((N_IFOS, N_TIMESTAMPS), PRECISIONS[self.precision][0]),
+            labels=((), np.int64),
+            params=((len(PARAMETER_NAMES),), np.float64),
+        )
+        if self.qgram_engine is not None:
+            fields["qgram"] = (
+                (N_IFOS,) + self.qgram_engine.shape,
+                self.qgram_engine.dtype,
+            )
+        return BatchLayout(self.batch_size, fields)
+
+    def __call__(self, index: int) -> Batch:
+        with precision_context(self.precision):
+            strain, labels, params = generate_training_set(
+                self.batch_size,
+                seed=self.seed,
+                label_probabilities=self.label_probabilities,
+                start=index * self.batch_size,
+            )
+            batch = dict(strain=strain, labels=labels, params=params)
+            if self.qgram_engine is not None:
+                batch["qgram"] = compute_qgrams(strain, self.qgram_engine)
+        return batch
+
+
+def _worker(produce: Callable[[int], Batch], pool_handle: tuple, tasks, ready, stop):
+    pool = SharedBatchPool.attach(pool_handle)
+    try:
+        while not stop.is_set():
+            task = tasks.get()
+            if task is None:
+                break
+            index, slot = task
+            try:
+                start = time.perf_counter()
+                batch = produce(index)
+                produced = time.perf_counter()
+                n_items = pool.write(slot, batch)
+                ready.put(
+                    (
+                        index,
+                        slot,
+                        n_items,
+                        produced - start,
+                        time.perf_counter() - produced,
+                        None,
+                    )
+                )
+            except Exception:
+                ready.put((index, slot, 0, 0.0, 0.0, traceback.format_exc()))
+    finally:
+        pool.close()
+
+
+class AsyncPipeline:
+    """
+    Produce batches in worker processes while the caller consumes them.
+
+    The consumer gets numpy views of the batch's slot by default. They are
+    only valid until the next batch is requested, because the slot is then
+    reused; pass ``copy=True`` to keep batches around.
+
+    Parameters
+    ----------
+    produce: callable
+        Picklable ``produce(index) -> dict`` of numpy arrays; batches are
+        consumed in ``index`` order.
+    n_batches: int, optional
+        Number of batches, ``0 .. n_batches - 1``; unlimited if None.
+    n_workers: int
+        Producer processes.
+    max_pending: int, optional
+        Most batches in production or waiting for the consumer (backpressure),
+        ``2 * n_workers`` by default.
+    layout: BatchLayout, optional
+        Shapes and dtypes of a batch, ``produce.layout()`` if None (as for
+        :class:`TrainingBatchProducer`).
+    copy: bool
+        Yield copies of the batches rather than views of their slots.
+    start_method: str, optional
+        ``multiprocessing`` start method (the platform default if None).
+    shutdown_timeout: float
+        Seconds to wait for workers to finish their current batch on
+        shutdown before terminating them.
+    """
+
+    def __init__(
+        self,
+        produce: Callable[[int], Batch],
+        n_batches: Optional[int] = None,
+        n_workers: int = 1,
+        max_pending: Optional[int] = None,
+        layout: Optional[BatchLayout] = None,
+        copy: bool = False,
+        start_method: Optional[str] = None,
+        shutdown_timeout: float = 10.0,
+    ):
+        self.produce = produce
+        self.n_batches = n_batches
+        self.n_workers = n_workers
+        self.max_pending = max_pending or 2 * n_workers
+        if self.max_pending < 1:
+            raise ValueError(f"max_pending must be at least 1, got {self.max_pending}")
+        if layout is None:
+            if not hasattr(produce, "layout"):
+                raise ValueError(
+                    "Pass the BatchLayout of the batches produce(index) returns"
+                )
+            layout = produce.layout()
+        self.layout = layout
+        self.copy = copy
+        self.shutdown_timeout = shutdown_timeout
+        self.stats = PipelineStats(n_workers=n_workers)
+        self.workers: List[multiprocessing.Process] = []
+        self._context = multiprocessing.get_context(start_method)
+        self._started = self._closed = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        # created before the workers start, so that they share its resource tracker
+        self.pool = SharedBatchPool(self.layout, self.max_pending + 1)
+        self._tasks = self._context.Queue()
+        self._ready = self._context.Queue()
+        self._stop = self._context.Event()
+        self._received: Dict[int, tuple] = {}
+        self._n_issued = self._n_consumed = 0
+        self._start_time = time.perf_counter()
+        self.workers = [
+            self._context.Process(
+                target=_worker,
+                daemon=True,
+                args=(
+                    self.produce,
+                    self.pool.handle,
+                    self._tasks,
+                    self._ready,
+                    self._stop,
+                ),
+            )
+            for _ in range(self.n_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def _issue(self):
+        while (
+            self.n_batches is None or self._n_issued < self.n_batches
+        ) and self.pool.n_free:
+            self._tasks.put((self._n_issued, self.pool.acquire()))
+            self._n_issued += 1
+
+    def _receive(self, index: int) -> tuple:
+        while index not in self._received:
+            try:
+                message = self._ready.get(timeout=1.0)
+            except queue.Empty:
+                if not all(worker.is_alive() for worker in self.workers):
+                    raise RuntimeError("An AsyncPipeline worker exited unexpectedly")
+                continue
+            self._received[message[0]] = message
+        return self._received.pop(index)
+
+    def __iter__(self) -> Iterator[Batch]:
+        self.start()
+        try:
+            while self.n_batches is None or self._n_consumed < self.n_batches:
+                self._issue()
+                start = time.perf_counter()
+                index, slot, n_items, produce_seconds, write_seconds, error = (
+                    self._receive(self._n_consumed)
+                )
+                if error is not None:
+                    raise RuntimeError(f"Producer failed on batch {index}:\n{error}")
+                received = time.perf_counter()
+                batch = self.pool.views(slot, n_items)
+                if self.copy:
+                    batch = {name: view.copy() for name, view in batch.items()}
+                self._n_consumed += 1
+                self.stats.n_batches += 1
+                self.stats.n_items += n_items
+                self.stats.produce_seconds += produce_seconds
+                self.stats.transfer_seconds += write_seconds
+                self.stats.wait_seconds += received - start
+                yield batch
+                self.stats.consume_seconds += time.perf_counter() - received
+                self.pool.release(slot)
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the workers after their current batch and free the pool"""
+        if not self._started or self._closed:
+            return
+        self._closed = True
+        self.stats.wall_seconds = time.perf_counter() - self._start_time
+        self._stop.set()
+        for _ in self.workers:
+            self._tasks.put(None)
+        # keep draining while the workers finish: a process is only joinable
+        # once its queue data is flushed
+        deadline = time.perf_counter() + self.shutdown_timeout
+        while (
+            any(worker.is_alive() for worker in self.workers)
+            and time.perf_counter() < deadline
+        ):
+            self._drain(timeout=0.05)
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        self._drain()
+        self._received.clear()
+        self.pool.close()
+
+    def _drain(self, timeout: float = None):
+        while True:
+            try:
+                (
+                    self._ready.get(timeout=timeout)
+                    if timeout
+                    else self._ready.get_nowait()
+                )
+            except queue.Empty:
+                return
@@ -0,0 +1,375 @@
+"""
+Timing and memory benchmarks for each stage of the pipeline.
+
+Each stage is benchmarked at several batch sizes; results are written as
+JSON together with the versions of the main dependencies, and can be
+compared against a stored baseline to catch slowdowns::
+
+    python -m burst_search_pipeline.benchmarks --output results.json
+    python -m burst_search_pipeline.benchmarks --baseline results.json
+
+Everything runs offline on the CPU. Stages whose dependencies are not
+available (e.g. pycbc, or the starccato weights) are reported as skipped.
+Peak memory is measured with ``tracemalloc`` in a separate, untimed run, so
+it covers numpy/Python allocations but not torch's allocator.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from importlib import metadata
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+BATCH_SIZES = (1, 8, 32)
+REPEATS = 3
+TOLERANCE = 1.5  # slowdown factor flagged as a regression
+DEPENDENCIES = ("numpy", "scipy", "torch", "bilby", "starccato", "gwpy", "pycbc")
+
+STAGES: Dict[str, Callable[[int], Callable[[], object]]] = {}
+
+
+def stage(name: str):
+    """
+    Register a benchmark stage.
+
+    The decorated function takes the batch size, does any (untimed) setup and
+    returns a zero-argument callable that processes one batch.
+    """
+
+    def register(setup):
+        STAGES[name] = setup
+        return setup
+
+    return register
+
+
+@dataclass
+class BenchmarkResult:
+    stage: str
+    batch_size: int
+    seconds: float  # median wall time per batch
+    seconds_per_item: float
+    peak_memory_mb: float
+    status: str = "ok"  # "ok" or "skipped"
+    message: str = ""
+
+
+def _injection_parameters(n: int) -> List[dict]:
+    rng = np.random.default_rng(0)
+    return [
+        dict(
+            luminosity_distance=rng.uniform(1, 10),
+            geocent_time=1126259642.413,
+            ra=rng.uniform(0, 2 * np.pi),
+            dec=np.arcsin(rng.uniform(-1, 1)),
+            psi=rng.uniform(0, np.pi),
+        )
+        for _ in range(n)
+    ]
+
+
+def _noise_segments(n: int, n_samples: int) -> np.ndarray:
+    return np.random.default_rng(0).normal(size=(n, n_samples))
+
+
+@stage("import")
+def _import(n):
+    # n fresh interpreters importing the modules a worker process needs
+    code = (
+        "import burst_search_pipeline.training_data, burst_search_pipeline.streaming, "
+        "burst_search_pipeline.search.model"
+    )
+    return lambda: [
+        subprocess.run([sys.executable, "-c", code], check=True) for _ in range(n)
+    ]
+
+
+@stage("waveform")
+def _waveform(n):
+    from .waveform_generator import WAVEFORM_GENERATOR
+
+    parameters = _injection_parameters(n)
+    WAVEFORM_GENERATOR.time_domain_strain(parameters[0])  # load the starccato weights
+    return lambda: [WAVEFORM_GENERATOR.time_domain_strain(p) for p in parameters]
+
+
+@stage("waveform_batch")
+def _waveform_batch(n):
+    from .waveform_generator import generate_waveforms
+
+    generate_waveforms([0], 1.0)
+    return lambda: generate_waveforms(np.arange(n), 5.0)
+
+
+@stage("load_interferometers")
+def _load_interferometers(n):
+    from .lvk_interferometers import load_interferometers
+
+    rng = np.random.default_rng(0)
+    load_interferometers(rng=rng)
+    return lambda: [load_interferometers(rng=rng) for _ in range(n)]
+
+
+@stage("noise_batch")
+def _noise_batch(n):
+    from .lvk_interferometers import default_noise_source
+
+    source, rng = default_noise_source(), np.random.default_rng(0)
+    return lambda: source.time_domain(source.draw(n, rng))
+
+
+@stage("load_interferometers_with_injection")
+def _load_interferometers_with_injection(n):
+    from .lvk_interferometers import load_interferometers_with_injection
+
+    parameters = _injection_parameters(n)
+    rng = np.random.default_rng(0)
+    load_interferometers_with_injection(parameters[0], rng=rng)
+    return lambda: [load_interferometers_with_injection(p, rng=rng) for p in parameters]
+
+
+def _snr_inputs(n):
+    from .lvk_interferometers import load_interferometers
+
+    ifo = load_interferometers(rng=np.random.default_rng(0))[0]
+    rng = np.random.default_rng(1)
+    n_freq = len(ifo.frequency_array)
+    templates = (
+        rng.normal(size=(n, n_freq)) + 1j * rng.normal(size=(n, n_freq))
+    ) * 1e-23
+    data = dict(
+        data=ifo.frequency_domain_strain,
+        freq=ifo.frequency_array,
+        psd=ifo.power_spectral_density_array,
+        fmask=ifo.strain_data.frequency_mask,
+    )
+    return templates, data
+
+
+@stage("compute_snr")
+def _compute_snr(n):
+    from .snr import compute_snr
+
+    templates, data = _snr_inputs(n)
+    return lambda: [compute_snr(signal=t, **data) for t in templates]
+
+
+@stage("template_bank_filter")
+def _template_bank_filter(n):
+    from .snr import TemplateBankFilter
+
+    templates, data = _snr_inputs(n)
+    bank = TemplateBankFilter(templates)
+    return lambda: bank.filter(**data)
+
+
+@stage("gwpy_qtransform")
+def _gwpy_qtransform(n):
+    from gwpy.timeseries import TimeSeries
+
+    segments = _noise_segments(n, 4096)
+    return lambda: [
+        TimeSeries(x, sample_rate=4096).q_transform(whiten=False) for x in segments
+    ]
+
+
+@stage("pycbc_qtransform")
+def _pycbc_qtransform(n):
+    from pycbc.types import TimeSeries
+
+    segments = _noise_segments(n, 4096)
+    return lambda: [
+        TimeSeries(x, delta_t=1 / 4096).qtransform(logfsteps=64, qrange=(4, 64))
+        for x in segments
+    ]
+
+
+@stage("qtransform_engine")
+def _qtransform_engine(n):
+    from .training_data import default_qtransform_engine
+
+    engine = default_qtransform_engine()
+    segments = _noise_segments(n, engine.n_samples)
+    return lambda: engine.transform(segments)
+
+
+@stage("cubic_interp1d_upsample")
+def _cubic_interp1d_upsample(n):
+    from scipy.interpolate import interp1d
+
+    segments = _noise_segments(n, 256)
+    t, t_up = np.arange(256) / 4096, np.arange(511) / 8192
+    return lambda: [interp1d(t, x, kind="cubic")(t_up) for x in segments]
+
+
+@stage("resample")
+def _resample(n):
+    from .resample import Resampler
+
+    resampler, segments = Resampler(4096, 8192), _noise_segments(n, 256)
+    return lambda: resampler.resample(segments)
+
+
+@stage("model_predict")
+def _model_predict(n):
+    from .search.model import Model
+
+    rng = np.random.default_rng(0)
+    model = Model().fit(rng.normal(size=(2000, 200, 2)))
+    blocks = rng.normal(size=(n, 200, 2))
+    return lambda: model.predict(blocks)
+
+
+def _median_time(run: Callable[[], object], repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _peak_memory_mb(run: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_stage(
+    name: str, batch_size: int, repeats: int = REPEATS
+) -> BenchmarkResult:
+    try:
+        run = STAGES[name](batch_size)
+        run()  # warm-up
+    # missing optional dependency, weights not downloadable offline, ...
+    except Exception as e:
+        return BenchmarkResult(
+            name, batch_size, None, None, None, "skipped", f"{type(e).__name__}: {e}"
+        )
+    seconds = _median_time(run, repeats)
+    return BenchmarkResult(
+        name, batch_size, seconds, seconds / batch_size, _peak_memory_mb(run)
+    )
+
+
+def environment() -> dict:
+    versions = {}
+    for package in DEPENDENCIES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        versions=versions,
+    )
+
+
+def run_benchmarks(
+    stages: Sequence[str] = None,
+    batch_sizes: Sequence[int] = BATCH_SIZES,
+    repeats: int = REPEATS,
+) -> dict:
+    """Benchmark ``stages`` (default: all) at each batch size, as a JSON-able report"""
+    stages = list(STAGES) if stages is None else list(stages)
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(
+            f"unknown stages {sorted(unknown)}, choose from {list(STAGES)}"
+        )
+    results = [
+        benchmark_stage(name, n, repeats) for name in stages for n in batch_sizes
+    ]
+    return dict(
+        environment=environment(),
+        repeats=repeats,
+        results=[asdict(r) for r in results],
+    )
+
+
+def compare_to_baseline(
+    report: dict, baseline: dict, tolerance: float = TOLERANCE
+) -> List[dict]:
+    """
+    Stages that got slower than the baseline by more than ``tolerance``.
+
+    Results are matched on (stage, batch_size) and compared on the median
+    time per item; stages skipped in either report are ignored.
+    """
+    reference = {
+        (r["stage"], r["batch_size"]): r["seconds_per_item"]
+        for r in baseline["results"]
+        if r["status"] == "ok"
+    }
+    regressions = []
+    for r in report["results"]:
+        key = (r["stage"], r["batch_size"])
+        if r["status"] != "ok" or key not in reference:
+            continue
+        ratio = r["seconds_per_item"] / reference[key]
+        if ratio > tolerance:
+            regressions.append(
+                dict(stage=r["stage"], batch_size=r["batch_size"], slowdown=ratio)
+            )
+    return regressions
+
+
+def _format(report: dict) -> str:
+    lines = [f"{'stage':<38}{'batch':>6}{'s/batch':>12}{'s/item':>12}{'peak MB':>10}"]
+    for r in report["results"]:
+        if r["status"] == "ok":
+            lines.append(
+                f"{r['stage']:<38}{r['batch_size']:>6}{r['seconds']:>12.4g}"
+                f"{r['seconds_per_item']:>12.4g}{r['peak_memory_mb']:>10.1f}"
+            )
+        else:
+            lines.append(
+                f"{r['stage']:<38}{r['batch_size']:>6}  skipped ({r['message'][:60]})"
+            )
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=None)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=list(BATCH_SIZES))
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument(
+        "--baseline", help="JSON report to check for regressions against"
+    )
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.stages, args.batch_sizes, args.repeats)
+    print(_format(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print(
+                f"REGRESSION {r['stage']} (batch {r['batch_size']}): "
+                f"{r['slowdown']:.2f}x slower"
+            )
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
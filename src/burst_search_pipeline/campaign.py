@@ -0,0 +1,314 @@
+"""
+Injection-recovery campaigns: detection efficiency as a function of distance.
+
+Injections are drawn from an :class:`InjectionDistribution` and processed in
+batches: one call generates the waveforms, the noise is drawn as a
+``NoiseSource`` batch, the signals are projected onto the detectors with
+``DetectorProjector``, and the network SNRs (plus an optional
+``search.model.Model`` score) are computed for the whole batch. Batches run
+across a process pool. Each completed batch is checkpointed to its own file,
+so an interrupted campaign resumes where it stopped. Every batch is seeded
+by its index, so the results do not depend on the number of workers or on
+interruptions.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from functools import lru_cache
+from itertools import repeat
+from typing import Callable, Sequence, Tuple
+
+import numpy as np
+
+from .instrumentation import instrument, pool_map
+from .lvk_interferometers import IFO_NAMES, NoiseSource
+from .projection import DetectorProjector
+from .snr import batch_inner_product
+from .training_data import GEOCENT_TIME, sample_rng
+from .waveform_generator import WaveformBatch, generate_waveforms
+
+SNR_THRESHOLD = 8.0
+# Model.predict probability, i.e. a 1% background false-alarm probability
+MODEL_THRESHOLD = 0.99
+
+
+@dataclass
+class InjectionDistribution:
+    """
+    Population of injections.
+
+    Sky positions are isotropic and polarisation angles uniform. Distances
+    are drawn uniformly, log-uniformly or uniformly in volume over
+    ``distance_range``. Waveform seeds are drawn from ``range(n_seeds)``.
+    """
+
+    distance_range: Tuple[float, float] = (0.5, 20.0)  # kpc
+    distance_prior: str = "uniform"  # 'uniform', 'log-uniform' or 'volume'
+    n_seeds: int = 2**31
+    geocent_time: float = GEOCENT_TIME
+    # s, geocentre times are uniform in [geocent_time, geocent_time + time_span)
+    time_span: float = 86400.0
+
+    def __post_init__(self):
+        if self.distance_prior not in ("uniform", "log-uniform", "volume"):
+            raise ValueError(f"Unknown distance prior {self.distance_prior}")
+
+    def _distances(self, n, rng):
+        low, high = self.distance_range
+        if self.distance_prior == "uniform":
+            return rng.uniform(low, high, n)
+        if self.distance_prior == "log-uniform":
+            return np.exp(rng.uniform(np.log(low), np.log(high), n))
+        return rng.uniform(low**3, high**3, n) ** (1 / 3)
+
+    def sample(self, n: int, rng: np.random.Generator) -> dict:
+        """``n`` injections as a dict of (n,) arrays"""
+        return dict(
+            luminosity_distance=self._distances(n, rng),
+            ra=rng.uniform(0, 2 * np.pi, n),
+            dec=np.arcsin(rng.uniform(-1, 1, n)),
+            psi=rng.uniform(0, np.pi, n),
+            geocent_time=self.geocent_time + rng.uniform(0, self.time_span, n),
+            seed=rng.integers(self.n_seeds, size=n),
+        )
+
+
+@dataclass
+class CampaignResults:
+    """Per-injection parameters and recovered statistics, one row per injection"""
+
+    luminosity_distance: np.ndarray
+    ra: np.ndarray
+    dec: np.ndarray
+    psi: np.ndarray
+    geocent_time: np.ndarray
+    seed: np.ndarray
+    optimal_snr: np.ndarray  # network
+    matched_filter_snr: np.ndarray  # network
+    score: np.ndarray  # Model.predict probability, NaN without a model
+
+    def __len__(self):
+        return len(self.luminosity_distance)
+
+    @classmethod
+    def concatenate(cls, results: Sequence["CampaignResults"]) -> "CampaignResults":
+        return cls(
+            **{
+                f.name: np.concatenate([getattr(r, f.name) for r in results])
+                for f in fields(cls)
+            }
+        )
+
+    def detected(
+        self, snr_threshold: float = SNR_THRESHOLD, model_threshold: float = None
+    ) -> np.ndarray:
+        """
+        Injections recovered with a matched-filter SNR (or, if given, a model score)
+        above threshold
+        """
+        if model_threshold is not None:
+            return self.score >= model_threshold
+        return self.matched_filter_snr >= snr_threshold
+
+    def efficiency(
+        self,
+        distance_bins,
+        snr_threshold: float = SNR_THRESHOLD,
+        model_threshold: float = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Fraction of injections detected in each distance bin.
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray, np.ndarray):
+            bin centres, efficiencies and their binomial standard errors
+            (NaN for empty bins)
+        """
+        distance_bins = np.asarray(distance_bins)
+        index = np.digitize(self.luminosity_distance, distance_bins) - 1
+        inside = (index >= 0) & (index < len(distance_bins) - 1)
+        n_bins = len(distance_bins) - 1
+        total = np.bincount(index[inside], minlength=n_bins)
+        found = np.bincount(
+            index[inside],
+            weights=self.detected(snr_threshold, model_threshold)[inside],
+            minlength=n_bins,
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            efficiency = found / total
+            error = np.sqrt(efficiency * (1 - efficiency) / total)
+        return (distance_bins[1:] + distance_bins[:-1]) / 2, efficiency, error
+
+
+@lru_cache(maxsize=None)
+def _detectors(ifo_names: Tuple[str, ...]) -> Tuple[NoiseSource, DetectorProjector]:
+    # built once per worker process
+    noise_source = NoiseSource(ifo_names)
+    return noise_source, DetectorProjector(noise_source=noise_source)
+
+
+@instrument()
+def _run_batch(campaign: "InjectionCampaign", batch: int) -> CampaignResults:
+    start = batch * campaign.batch_size
+    n = min(campaign.batch_size, campaign.n_injections - start)
+    rng = sample_rng(campaign.seed, batch)
+    params = campaign.distribution.sample(n, rng)
+
+    noise_source, projector = _detectors(campaign.ifo_names)
+    waveforms: WaveformBatch = campaign.waveforms(
+        params["seed"], params["luminosity_distance"]
+    )
+    polarization = waveforms.frequency_domain_strain
+    signal = projector.project(
+        polarization,
+        polarization,
+        params["ra"],
+        params["dec"],
+        params["psi"],
+        params["geocent_time"],
+    )
+    data = noise_source.draw(n, rng) + signal
+
+    # network SNRs over each detector's frequency mask, for the whole batch at once
+    psd = np.where(
+        noise_source.frequency_mask, noise_source.power_spectral_density, np.inf
+    )
+    freq = noise_source.frequency_array
+    hh = batch_inner_product(signal, signal, freq, psd).sum(axis=-1)
+    dh = batch_inner_product(data, signal, freq, psd).sum(axis=-1)
+    optimal_snr = np.sqrt(hh)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matched_filter_snr = np.where(hh > 0, dh / optimal_snr, 0.0)
+
+    score = np.full(n, np.nan)
+    if campaign.model is not None:
+        strain = noise_source.time_domain(data)
+        campaign.model.check_block_length(strain.shape[-1], "injection segments")
+        # Model blocks are (n x samples x channels)
+        score = campaign.model.predict(strain.transpose(0, 2, 1))
+    return CampaignResults(
+        optimal_snr=optimal_snr,
+        matched_filter_snr=matched_filter_snr,
+        score=score,
+        **params,
+    )
+
+
+def _qualified_name(func) -> str:
+    """``module.qualname`` of a function or method (of its class for other callables)"""
+    name = getattr(func, "__qualname__", type(func).__qualname__)
+    return f"{getattr(func, '__module__', type(func).__module__)}.{name}"
+
+
+@dataclass
+class InjectionCampaign:
+    """
+    A checkpointed injection-recovery campaign stored in directory ``path``.
+
+    Parameters
+    ----------
+    path: str
+        Checkpoint directory, one ``batch_XXXXXX.npz`` per completed batch.
+    n_injections: int
+    distribution: InjectionDistribution
+    seed: int
+        Root seed; batch ``i`` is drawn from ``sample_rng(seed, i)``.
+    batch_size: int
+        Injections per batch (and per checkpoint).
+    model: search.model.Model, optional
+        Fitted model used to score each injection's time-domain strain; it
+        must have been fitted on ``N_TIMESTAMPS``-sample blocks.
+    waveforms: callable
+        Maps (seeds, distances) to a :class:`WaveformBatch`; e.g.
+        ``WaveformCache().generate_waveforms`` to reuse waveforms of
+        repeated seeds.
+    ifo_names: sequence of str
+
+    The configuration, including the model's fingerprint and the waveform
+    function's qualified name, is recorded in ``campaign.json``; reopening
+    the directory with a different one raises a ValueError rather than
+    mixing results.
+    """
+
+    path: str
+    n_injections: int
+    distribution: InjectionDistribution = field(default_factory=InjectionDistribution)
+    seed: int = 0
+    batch_size: int = 1024
+    model: object = None
+    waveforms: Callable[..., WaveformBatch] = generate_waveforms
+    ifo_names: Sequence[str] = IFO_NAMES
+
+    def __post_init__(self):
+        self.ifo_names = tuple(self.ifo_names)
+        os.makedirs(self.path, exist_ok=True)
+        config = dict(
+            n_injections=self.n_injections,
+            seed=self.seed,
+            batch_size=self.batch_size,
+            distribution=asdict(self.distribution),
+            ifo_names=list(self.ifo_names),
+            model=None if self.model is None else self.model.fingerprint,
+            waveforms=_qualified_name(self.waveforms),
+        )
+        config_path = os.path.join(self.path, "campaign.json")
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                stored = json.load(f)
+            if stored != json.loads(json.dumps(config)):
+                raise ValueError(
+                    f"Campaign at {self.path} was configured with {stored}, "
+                    f"not {config}"
+                )
+        else:
+            with open(config_path, "w") as f:
+                json.dump(config, f, indent=2)
+
+    @property
+    def n_batches(self) -> int:
+        return -(-self.n_injections // self.batch_size)
+
+    def _batch_path(self, batch: int) -> str:
+        return os.path.join(self.path, f"batch_{batch:06d}.npz")
+
+    def completed_batches(self):
+        return [i for i in range(self.n_batches) if os.path.exists(self._batch_path(i))]
+
+    def _save(self, batch: int, result: CampaignResults):
+        tmp = self._batch_path(batch) + ".tmp.npz"
+        np.savez(tmp, **asdict(result))
+        # a batch file is either complete or absent
+        os.replace(tmp, self._batch_path(batch))
+
+    def run(self, n_workers: int = 1) -> CampaignResults:
+        """Run the batches not yet checkpointed, then return all results"""
+        done = set(self.completed_batches())
+        todo = [i for i in range(self.n_batches) if i not in done]
+        if n_workers == 1:
+            for batch in todo:
+                self._save(batch, _run_batch(self, batch))
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                for batch, result in zip(
+                    todo, pool_map(pool, _run_batch, repeat(self), todo)
+                ):
+                    self._save(batch, result)
+        return self.results()
+
+    def results(self) -> CampaignResults:
+        """Results of the completed batches, in injection order"""
+        results = []
+        for batch in self.completed_batches():
+            with np.load(self._batch_path(batch)) as data:
+                results.append(
+                    CampaignResults(
+                        **{f.name: data[f.name] for f in fields(CampaignResults)}
+                    )
+                )
+        if not results:
+            empty = np.empty(0)
+            return CampaignResults(*(empty for _ in fields(CampaignResults)))
+        return CampaignResults.concatenate(results)
@@ -0,0 +1,190 @@
+"""
+Memory-mapped access to the challenge's (Nblocks, 200, 2) block datasets.
+
+``.npy`` files are memory-mapped directly. Members of uncompressed ``.npz``
+archives are memory-mapped in place inside the zip; compressed members are
+decompressed once, in a streaming copy, to a ``.npy`` cache file that is
+then memory-mapped. Either way a block is only read when it is used.
+"""
+
+import os
+import shutil
+import zipfile
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from .precision import real_dtype
+from .training_data import BurstType
+
+BLOCK_SIZE = 200
+CHANNELS = ("H1", "L1")
+CHALLENGE_FILES = {
+    "background.npz": BurstType.NOISE,
+    "bbh_for_challenge.npy": BurstType.SIGNAL,
+    "sglf_for_challenge.npy": BurstType.SIGNAL,
+}
+
+
+def _memmap_stored_member(path, info: zipfile.ZipInfo) -> np.ndarray:
+    with open(path, "rb") as f:
+        # the local header's extra field can differ from the central directory's
+        f.seek(info.header_offset + 26)
+        name_length, extra_length = np.frombuffer(f.read(4), dtype="<u2")
+        f.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+        version = np.lib.format.read_magic(f)
+        read_header = (
+            np.lib.format.read_array_header_1_0
+            if version == (1, 0)
+            else np.lib.format.read_array_header_2_0
+        )
+        shape, fortran_order, dtype = read_header(f)
+        offset = f.tell()
+    return np.memmap(
+        path,
+        dtype=dtype,
+        mode="r",
+        offset=offset,
+        shape=shape,
+        order="F" if fortran_order else "C",
+    )
+
+
+def open_block_array(
+    path: str, key: Optional[str] = None, cache_dir: Optional[str] = None
+) -> np.ndarray:
+    """
+    Open a ``.npy`` file, or one array of a ``.npz`` archive, without reading it
+    into memory.
+
+    Parameters
+    ----------
+    path: str
+    key: str, optional
+        Array name inside a ``.npz`` archive (its only/first array if None).
+    cache_dir: str, optional
+        Where compressed ``.npz`` members are decompressed to (next to the
+        archive by default).
+    """
+    if not path.endswith(".npz"):
+        return np.load(path, mmap_mode="r")
+    with zipfile.ZipFile(path) as archive:
+        members = [name for name in archive.namelist() if name.endswith(".npy")]
+        name = f"{key}.npy" if key is not None else members[0]
+        info = archive.getinfo(name)
+        if info.compress_type == zipfile.ZIP_STORED:
+            return _memmap_stored_member(path, info)
+        cache_dir = cache_dir or os.path.dirname(os.path.abspath(path))
+        cache_path = os.path.join(cache_dir, f".{os.path.basename(path)[:-4]}_{name}")
+        if not os.path.exists(cache_path):
+            os.makedirs(cache_dir, exist_ok=True)
+            # per-process name, so concurrent loaders do not write the same file
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with archive.open(info) as src, open(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst, length=2**24)
+            os.replace(tmp, cache_path)
+    return np.load(cache_path, mmap_mode="r")
+
+
+class ChallengeDataset:
+    """
+    Labelled view over several block files.
+
+    Parameters
+    ----------
+    data_dir: str
+        Directory holding the files.
+    files: dict, optional
+        File name -> :class:`BurstType` label (``CHALLENGE_FILES`` by default;
+        missing files are skipped).
+    cache_dir: str, optional
+        See :func:`open_block_array`.
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        files: Optional[Dict[str, BurstType]] = None,
+        cache_dir: Optional[str] = None,
+    ):
+        files = files or CHALLENGE_FILES
+        self.names, self.arrays, self.file_labels = [], [], []
+        for name, label in files.items():
+            path = os.path.join(data_dir, name)
+            if not os.path.exists(path):
+                continue
+            array = open_block_array(path, cache_dir=cache_dir)
+            if array.ndim != 3 or array.shape[2] != len(CHANNELS):
+                raise ValueError(
+                    f"{path}: expected (Nblocks, samples, {len(CHANNELS)}) blocks, "
+                    f"got {array.shape}"
+                )
+            self.names.append(name)
+            self.arrays.append(array)
+            self.file_labels.append(label)
+        if not self.arrays:
+            raise FileNotFoundError(f"None of {list(files)} found in {data_dir}")
+        self._offsets = np.cumsum([0] + [len(a) for a in self.arrays])
+        self._file_label_values = np.array([label.value for label in self.file_labels])
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    @property
+    def labels(self) -> np.ndarray:
+        """(Nblocks,) label value of every block"""
+        return np.repeat(self._file_label_values, np.diff(self._offsets))
+
+    def iter_blocks(
+        self,
+        channel: Optional[str] = None,
+        batch_size: int = 4096,
+        file: Optional[str] = None,
+    ) -> Iterator[np.ndarray]:
+        """
+        Sequentially yield batches of blocks: (batch x 200) for one ``channel``
+        ('H1'/'L1'), or (batch x 200 x 2) if None; optionally from one ``file`` only.
+        """
+        arrays = self.arrays if file is None else [self.arrays[self.names.index(file)]]
+        for array in arrays:
+            for start in range(0, len(array), batch_size):
+                blocks = array[start : start + batch_size]
+                if channel is not None:
+                    blocks = blocks[..., CHANNELS.index(channel)]
+                yield np.asarray(blocks, dtype=real_dtype())
+
+    def read(self, indices) -> Tuple[np.ndarray, np.ndarray]:
+        """(n x 200 x 2) blocks and (n,) labels at the given global indices, in order"""
+        indices = np.asarray(indices, dtype=np.int64)
+        file_ids = np.searchsorted(self._offsets, indices, side="right") - 1
+        blocks = np.empty(
+            (len(indices),) + self.arrays[0].shape[1:], dtype=real_dtype()
+        )
+        for file_id in np.unique(file_ids):
+            rows = np.flatnonzero(file_ids == file_id)
+            local = indices[rows] - self._offsets[file_id]
+            order = np.argsort(local)
+            blocks[rows[order]] = self.arrays[file_id][local[order]]
+        # labels looked up per file: O(batch), not O(dataset)
+        return blocks, self._file_label_values[file_ids]
+
+    def sample_minibatch(
+        self, batch_size: int, rng: np.random.Generator = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Uniformly sample ``batch_size`` blocks without replacement"""
+        rng = rng or np.random.default_rng()
+        return self.read(
+            rng.choice(len(self), size=min(batch_size, len(self)), replace=False)
+        )
+
+    def iter_minibatches(
+        self, batch_size: int, shuffle: bool = True, rng: np.random.Generator = None
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield ``(X, y)`` minibatches covering the dataset once"""
+        order = (
+            (rng or np.random.default_rng()).permutation(len(self))
+            if shuffle
+            else np.arange(len(self))
+        )
+        for start in range(0, len(self), batch_size):
+            yield self.read(order[start : start + batch_size])
@@ -1,12 +1,11 @@
 import warnings
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Sequence
 
-import bilby
-import matplotlib.pyplot as plt
 import numpy as np
-from bilby.gw import utils as gwutils
-from scipy.signal import gausspulse
 
-np.random.seed(2)
+from .instrumentation import instrument
 
 DATA_COL = 'tab:gray'
 SIGNAL_COL = 'tab:orange'
@@ -47,21 +46,21 @@ def __glitch(time_array, luminosity_distance, **kwargs):
         A dictionary containing the plus and cross components of the signal.
     """
 
+    from scipy.signal import gausspulse
+
     fc = kwargs.get('central_freq', 250)
     i,q, e= gausspulse(time_array, fc=fc, bw=0.5, bwr=-6, tpr=-100, retquad=True, retenv=True,)
 
-
     # waveforms generated at 10kpc, so scale to the luminosity distance
     scaling = 1e-21 * (10.0 / luminosity_distance)
     waveform = scaling * q
     return {'plus': waveform, 'cross': waveform}
 
 
-
-
-
-
+@lru_cache(maxsize=None)
 def _get_waveform_generator():
+    import bilby
+
     # Create the waveform_generator using a supernova source function
     waveform_generator = bilby.gw.waveform_generator.WaveformGenerator(
         duration=DURATION,
@@ -73,4 +72,177 @@ def _get_waveform_generator():
     return waveform_generator
 
 
-GLITCH_GENERATOR = _get_waveform_generator()
+def __getattr__(name):
+    # GLITCH_GENERATOR is built on first access, importing bilby only then
+    if name == "GLITCH_GENERATOR":
+        return _get_waveform_generator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+GLITCH_FAMILIES = ("sine_gaussian", "gaussian_pulse", "blip", "scattered_light")
+
+
+@dataclass
+class GlitchBatch:
+    """A population of glitches, one row per glitch"""
+
+    time_domain_strain: np.ndarray  # (n x N_TIMESTAMPS)
+    frequency_domain_strain: np.ndarray  # (n x N_TIMESTAMPS//2+1), rfft / SAMPLING_FREQ
+    family: np.ndarray  # index into GLITCH_FAMILIES
+    central_frequency: np.ndarray  # Hz
+    # quality factor: fractional bandwidth for gaussian pulses, arch length
+    # (in periods) for scattered light
+    q: np.ndarray
+    snr: np.ndarray  # optimal SNR against the PSD used for scaling
+    t0: np.ndarray  # peak time [s] from the segment start
+
+    def __len__(self):
+        return len(self.family)
+
+
+def _unit_glitches(family, f0, q, t0, phase, t):
+    """Peak-normalised glitch shapes of every family on the broadcast (n x N) times"""
+    dt = t[None, :] - t0[:, None]
+    f0, q, phase = f0[:, None], q[:, None], phase[:, None]
+    waveform = np.zeros_like(dt)
+
+    sine_gaussian = family == GLITCH_FAMILIES.index("sine_gaussian")
+    tau = q / (np.sqrt(2) * np.pi * f0)
+    waveform = np.where(
+        sine_gaussian[:, None],
+        np.exp(-((dt / tau) ** 2)) * np.sin(2 * np.pi * f0 * dt + phase),
+        waveform,
+    )
+
+    # scipy.signal.gausspulse with fractional bandwidth q at -6 dB
+    gaussian_pulse = family == GLITCH_FAMILIES.index("gaussian_pulse")
+    a = -((np.pi * f0 * q) ** 2) / (4.0 * np.log(10 ** (-6 / 20.0)))
+    waveform = np.where(
+        gaussian_pulse[:, None],
+        np.exp(-a * dt**2) * np.cos(2 * np.pi * f0 * dt + phase),
+        waveform,
+    )
+
+    # blips: short, broadband Ricker wavelets peaking at f0
+    blip = family == GLITCH_FAMILIES.index("blip")
+    x = (np.pi * f0 * dt) ** 2
+    waveform = np.where(blip[:, None], (1 - 2 * x) * np.exp(-x), waveform)
+
+    # scattered light: a low-frequency arch, f(t) = f0 cos(pi dt / T),
+    # with T = q periods of f0
+    scattered = family == GLITCH_FAMILIES.index("scattered_light")
+    arch = q / f0
+    chirp_phase = 2 * f0 * arch * np.sin(np.pi * dt / arch) + phase
+    waveform = np.where(
+        scattered[:, None],
+        np.exp(-((dt / (arch / 2)) ** 2)) * np.sin(chirp_phase),
+        waveform,
+    )
+    return waveform / np.abs(waveform).max(axis=1, keepdims=True)
+
+
+def _optimal_snr(frequency_domain_strain, psd, sampling_frequency, n_samples):
+    df = sampling_frequency / n_samples
+    valid = np.isfinite(psd) & (psd > 0)
+    power = np.abs(frequency_domain_strain[:, valid]) ** 2 / psd[valid]
+    return np.sqrt(4 * df * power.sum(axis=1))
+
+
+@instrument()
+def generate_glitches(
+    n: int,
+    rng: np.random.Generator = None,
+    families: Sequence[str] = GLITCH_FAMILIES,
+    frequency_range=(30.0, 500.0),
+    q_range=(3.0, 30.0),
+    snr_range=(5.0, 50.0),
+    psd: np.ndarray = None,
+    sampling_frequency: float = SAMPLING_FREQ,
+    n_samples: int = N_TIMESTAMPS,
+) -> GlitchBatch:
+    """
+    Draw a population of glitches, computed analytically for the whole batch.
+
+    Central frequencies (log-uniform), quality factors (log-uniform), peak
+    times, phases and optimal SNRs (uniform) are randomised per glitch. Blips
+    sit in the lower third of ``frequency_range`` and scattered-light arches
+    below 60 Hz; gaussian pulses use a fractional bandwidth of ``1 / sqrt(q)``.
+
+    Parameters
+    ----------
+    n: int
+        Number of glitches.
+    rng: np.random.Generator, optional
+    families: sequence of str
+        Families to draw from (uniformly), a subset of ``GLITCH_FAMILIES``.
+    frequency_range, q_range, snr_range: (float, float)
+    psd: np.ndarray, optional
+        One-sided PSD on the rfft grid used to scale the glitches to their
+        SNR (H1's design PSD by default).
+
+    Returns
+    -------
+    GlitchBatch
+    """
+    rng = rng or np.random.default_rng()
+    family = np.array([GLITCH_FAMILIES.index(f) for f in families])[
+        rng.integers(len(families), size=n)
+    ]
+    f0 = np.exp(rng.uniform(*np.log(frequency_range), size=n))
+    blip = family == GLITCH_FAMILIES.index("blip")
+    f0[blip] = frequency_range[0] + (f0[blip] - frequency_range[0]) / 3
+    scattered = family == GLITCH_FAMILIES.index("scattered_light")
+    f0[scattered] = np.exp(
+        rng.uniform(np.log(20.0), np.log(60.0), size=scattered.sum())
+    )
+    q = np.exp(rng.uniform(*np.log(q_range), size=n))
+    q[family == GLITCH_FAMILIES.index("gaussian_pulse")] **= -0.5
+    duration = n_samples / sampling_frequency
+    t0 = rng.uniform(0.25, 0.75, size=n) * duration
+    phase = rng.uniform(0, 2 * np.pi, size=n)
+    snr = rng.uniform(*snr_range, size=n)
+
+    t = np.arange(n_samples) / sampling_frequency
+    time_domain_strain = _unit_glitches(family, f0, q, t0, phase, t)
+    frequency_domain_strain = (
+        np.fft.rfft(time_domain_strain, axis=-1) / sampling_frequency
+    )
+    if psd is None:
+        from .lvk_interferometers import NoiseSource, default_noise_source
+
+        noise_source = default_noise_source()
+        if (noise_source.sampling_frequency, noise_source.duration) != (
+            sampling_frequency,
+            duration,
+        ):
+            noise_source = NoiseSource(("H1",), sampling_frequency, duration)
+        psd = noise_source.power_spectral_density[0]
+    scale = snr / _optimal_snr(
+        frequency_domain_strain, psd, sampling_frequency, n_samples
+    )
+    return GlitchBatch(
+        time_domain_strain=time_domain_strain * scale[:, None],
+        frequency_domain_strain=frequency_domain_strain * scale[:, None],
+        family=family,
+        central_frequency=f0,
+        q=q,
+        snr=snr,
+        t0=t0,
+    )
+
+
+def inject_glitches(
+    noise: np.ndarray, glitches: GlitchBatch, ifo_index: np.ndarray
+) -> np.ndarray:
+    """
+    Add each glitch to a single detector of (n x N_ifo x N) noise (time or
+    frequency domain, matching the last axis), returning a new array.
+    """
+    strain = (
+        glitches.time_domain_strain
+        if noise.shape[-1] == glitches.time_domain_strain.shape[-1]
+        else glitches.frequency_domain_strain
+    )
+    noise = noise.copy()
+    noise[np.arange(len(noise)), ifo_index] += strain
+    return noise
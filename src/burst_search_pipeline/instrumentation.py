@@ -0,0 +1,215 @@
+"""
+Opt-in per-stage instrumentation of the pipeline's hot paths.
+
+Stages are recorded with the :func:`instrument` decorator or the
+:func:`stage` context manager. Each stage tracks its call count, wall and
+CPU time, and the bytes of the numpy arrays it returns. Recording is off by
+default. While off, an instrumented call costs one attribute check. Turn it
+on with :func:`enable` (or ``BURST_SEARCH_INSTRUMENT=1``) and dump the
+summary at the end of a batch job::
+
+    from burst_search_pipeline import instrumentation
+    instrumentation.enable()
+    ...
+    instrumentation.dump("stages.json")
+
+Nested stages are recorded inclusively: the outer stage's times include the
+inner stage's. Work run in a process pool through :func:`pool_map` is
+recorded in the workers and merged into the calling process's registry.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields, is_dataclass
+from itertools import repeat
+from typing import Callable, Dict, Iterator
+
+import numpy as np
+
+
+@dataclass
+class StageStats:
+    calls: int = 0
+    wall_time: float = 0.0  # s
+    cpu_time: float = 0.0  # s, of the calling thread's process
+    output_bytes: int = 0  # numpy array bytes returned or reported with ``add_bytes``
+
+    @property
+    def mean_wall_time(self) -> float:
+        return self.wall_time / self.calls if self.calls else 0.0
+
+
+def array_bytes(obj) -> int:
+    """
+    Bytes of the numpy arrays in ``obj``, looking one level into tuples, lists,
+    dicts and dataclasses
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (tuple, list)):
+        items = obj
+    elif isinstance(obj, dict):
+        items = obj.values()
+    elif is_dataclass(obj) and not isinstance(obj, type):
+        items = (getattr(obj, f.name) for f in fields(obj))
+    else:
+        return 0
+    return sum(item.nbytes for item in items if isinstance(item, np.ndarray))
+
+
+class Registry:
+    """Accumulated :class:`StageStats` keyed by stage name"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        name: str,
+        wall_time: float,
+        cpu_time: float,
+        output_bytes: int = 0,
+        calls: int = 1,
+    ):
+        with self._lock:
+            stats = self.stages.setdefault(name, StageStats())
+            stats.calls += calls
+            stats.wall_time += wall_time
+            stats.cpu_time += cpu_time
+            stats.output_bytes += output_bytes
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+
+    def summary(self) -> Dict[str, dict]:
+        """JSON-serialisable stats, slowest stage first"""
+        with self._lock:
+            ordered = sorted(self.stages.items(), key=lambda item: -item[1].wall_time)
+            return {
+                name: dict(asdict(stats), mean_wall_time=stats.mean_wall_time)
+                for name, stats in ordered
+            }
+
+    def merge(self, summary: Dict[str, dict]):
+        """Add a :meth:`summary` from another process (e.g. a pool worker)"""
+        for name, stats in summary.items():
+            self.record(
+                name,
+                stats["wall_time"],
+                stats["cpu_time"],
+                stats["output_bytes"],
+                stats["calls"],
+            )
+
+
+REGISTRY = Registry(
+    enabled=os.environ.get("BURST_SEARCH_INSTRUMENT", "0") not in ("", "0")
+)
+
+
+def enable():
+    REGISTRY.enabled = True
+
+
+def disable():
+    REGISTRY.enabled = False
+
+
+def reset():
+    REGISTRY.reset()
+
+
+def summary() -> Dict[str, dict]:
+    return REGISTRY.summary()
+
+
+def dump(path: str):
+    """Write the :func:`summary` as JSON"""
+    with open(path, "w") as f:
+        json.dump(summary(), f, indent=2)
+
+
+def _recorded_call(enabled: bool, func: Callable, *args):
+    """Call ``func`` in a pool worker, returning its result and recorded stages"""
+    REGISTRY.enabled = enabled
+    # a forked worker starts with a copy of the parent's stages
+    REGISTRY.reset()
+    result = func(*args)
+    return result, REGISTRY.summary()
+
+
+def pool_map(pool: Executor, func: Callable, *iterables) -> Iterator:
+    """
+    ``pool.map(func, *iterables)`` that records the stages run by the worker
+    processes in this process's registry
+    """
+    calls = pool.map(_recorded_call, repeat(REGISTRY.enabled), repeat(func), *iterables)
+    for result, stages in calls:
+        REGISTRY.merge(stages)
+        yield result
+
+
+class _StageTimer:
+    def __init__(self):
+        self.output_bytes = 0
+
+    def add_bytes(self, obj):
+        """Count the arrays in ``obj`` (or an int number of bytes) against the stage"""
+        self.output_bytes += obj if isinstance(obj, int) else array_bytes(obj)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Record the enclosed block as stage ``name``.
+
+    Yields an object whose ``add_bytes`` reports the arrays the block
+    produced (``None`` while instrumentation is disabled).
+    """
+    if not REGISTRY.enabled:
+        yield None
+        return
+    timer = _StageTimer()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield timer
+    finally:
+        REGISTRY.record(
+            name,
+            time.perf_counter() - wall,
+            time.process_time() - cpu,
+            timer.output_bytes,
+        )
+
+
+def instrument(name: str = None) -> Callable:
+    """Decorator recording each call as a stage (``module.qualname`` by default)"""
+
+    def decorator(func):
+        stage_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return func(*args, **kwargs)
+            wall, cpu = time.perf_counter(), time.process_time()
+            result = func(*args, **kwargs)
+            REGISTRY.record(
+                stage_name,
+                time.perf_counter() - wall,
+                time.process_time() - cpu,
+                array_bytes(result),
+            )
+            return result
+
+        return wrapper
+
+    return decorator
@@ -1,36 +1,178 @@
-import bilby
-from bilby.gw.detector import InterferometerList
-from .waveform_generator import WAVEFORM_GENERATOR
-from typing import Dict
+import copy
+from functools import lru_cache
+
+import numpy as np
+from .instrumentation import instrument
+from .precision import complex_dtype
+from .waveform_generator import DURATION, SAMPLING_FREQ, _get_waveform_generator
+from typing import TYPE_CHECKING, Dict, Sequence
 from dataclasses import dataclass
 
+if TYPE_CHECKING:  # bilby is imported on first use
+    from bilby.gw.detector import InterferometerList
+
 DEFAULT_INJECTION= dict(
 
 )
+IFO_NAMES = ("H1", "L1")
 
 @dataclass
 class IFODataStream:
-    interferometers: InterferometerList
+    interferometers: "InterferometerList"
     time_domain_strain: Dict[str, float]
     frequency_domain_strain: Dict[str, float]
 
-def load_interferometers(t0=0) -> InterferometerList:
-    """Returns up interferometer objects (LIGO-Hanford (H1) and LIGO-Livingston (L1))"""
-    ifos = InterferometerList(["H1", "L1"])
-    ifos.set_strain_data_from_power_spectral_densities(
-        sampling_frequency=WAVEFORM_GENERATOR.sampling_frequency,
-        duration=WAVEFORM_GENERATOR.duration,
-        start_time=t0
+
+@lru_cache(maxsize=None)
+def _cached_interferometers(ifo_names: Sequence[str]) -> "InterferometerList":
+    from bilby.gw.detector import InterferometerList
+
+    # building an InterferometerList re-reads the detector and PSD files,
+    # copying a loaded one is ~50x faster
+    return InterferometerList(list(ifo_names))
+
+
+class NoiseSource:
+    """
+    Coloured Gaussian noise for a set of detectors, drawn in batches.
+
+    The detectors and their PSDs are loaded once; :meth:`draw` then produces
+    (batch x N_ifo x N_freq) noise in a single vectorised operation. The
+    noise is drawn exactly as bilby's
+    ``set_strain_data_from_power_spectral_densities`` draws it, so
+    ``draw(1, rng)`` is bit-identical to bilby's noise for an identically
+    seeded generator, and ``draw(n, rng)`` to n consecutive realisations.
+
+    Parameters
+    ----------
+    ifo_names: sequence of str
+    sampling_frequency: float
+    duration: float
+    """
+
+    def __init__(
+        self,
+        ifo_names: Sequence[str] = IFO_NAMES,
+        sampling_frequency: float = None,
+        duration: float = None,
+    ):
+        self.sampling_frequency = sampling_frequency or SAMPLING_FREQ
+        self.duration = duration or DURATION
+        self.interferometers = copy.deepcopy(_cached_interferometers(tuple(ifo_names)))
+        for ifo in self.interferometers:
+            ifo.strain_data.set_from_zero_noise(
+                sampling_frequency=self.sampling_frequency, duration=self.duration
+            )
+        self.frequency_array = self.interferometers[0].strain_data.frequency_array
+        self.frequency_mask = np.array(
+            [ifo.strain_data.frequency_mask for ifo in self.interferometers]
+        )
+        self.power_spectral_density = np.array(
+            [ifo.power_spectral_density_array for ifo in self.interferometers]
+        )
+
+        scale = np.empty_like(self.power_spectral_density)
+        for i, ifo in enumerate(self.interferometers):
+            psd = ifo.power_spectral_density
+            with np.errstate(invalid="ignore"):
+                scale[i] = (
+                    psd.power_spectral_density_interpolated(self.frequency_array) ** 0.5
+                )
+            out_of_bounds = (self.frequency_array < min(psd.frequency_array)) | (
+                self.frequency_array > max(psd.frequency_array)
+            )
+            scale[i, out_of_bounds] = 0
+        # set DC and Nyquist = 0
+        scale[:, 0] = 0
+        if int(np.round(self.duration * self.sampling_frequency)) % 2 == 0:
+            scale[:, -1] = 0
+        self._scale = scale
+
+    @property
+    def n_ifos(self):
+        return len(self.interferometers)
+
+    @instrument()
+    def draw(self, n: int, rng: np.random.Generator = None) -> np.ndarray:
+        """
+        (n x N_ifo x N_freq) frequency-domain noise, from bilby's generator if ``rng``
+        is None.
+
+        The noise is returned in the current :mod:`precision`, but always
+        drawn in double so that both precisions consume the same random stream.
+        """
+        if rng is None:
+            from bilby.core.utils import random as bilby_random
+
+            rng = bilby_random.rng
+        white = rng.normal(
+            0, 0.5 * self.duration**0.5, (n, self.n_ifos, 2, len(self.frequency_array))
+        )
+        noise = np.empty(
+            (n, self.n_ifos, len(self.frequency_array)), dtype=complex_dtype()
+        )
+        noise.real = white[:, :, 0] * self._scale
+        noise.imag = white[:, :, 1] * self._scale
+        return noise
+
+    def time_domain(self, frequency_domain_strain: np.ndarray) -> np.ndarray:
+        """Inverse of bilby's ``nfft`` along the last axis"""
+        n_samples = int(np.round(self.duration * self.sampling_frequency))
+        return (
+            np.fft.irfft(frequency_domain_strain, n=n_samples, axis=-1)
+            * self.sampling_frequency
+        )
+
+    def interferometers_from_noise(
+        self, frequency_domain_strain: np.ndarray, start_time: float = 0
+    ) -> "InterferometerList":
+        """Fresh interferometers holding one (N_ifo x N_freq) noise realisation"""
+        ifos = copy.deepcopy(
+            _cached_interferometers(tuple(ifo.name for ifo in self.interferometers))
+        )
+        for ifo, strain in zip(ifos, frequency_domain_strain):
+            ifo.strain_data.set_from_frequency_domain_strain(
+                strain,
+                sampling_frequency=self.sampling_frequency,
+                duration=self.duration,
+                start_time=start_time,
+            )
+        return ifos
+
+
+@lru_cache(maxsize=None)
+def default_noise_source() -> NoiseSource:
+    """Shared H1/L1 noise source on the WAVEFORM_GENERATOR grid"""
+    return NoiseSource()
+
+
+@instrument()
+def load_interferometers(t0=0, rng: np.random.Generator = None) -> "InterferometerList":
+    """Returns up interferometer objects (LIGO-Hanford (H1) and LIGO-Livingston (L1))
+
+    The noise is drawn from ``rng`` if given, otherwise from bilby's global generator.
+    """
+    noise_source = default_noise_source()
+    return noise_source.interferometers_from_noise(
+        noise_source.draw(1, rng)[0], start_time=t0
     )
-    return ifos
 
 
+@instrument()
 def load_interferometers_with_injection(
-        injection_parameters: Dict[str, float] = None
+    injection_parameters: Dict[str, float] = None,
+    rng: np.random.Generator = None,
 ) -> IFODataStream:
-    injection_strain_time = WAVEFORM_GENERATOR.time_domain_strain(injection_parameters)
-    injection_strain = WAVEFORM_GENERATOR.frequency_domain_strain(injection_parameters)
-    ifos = load_interferometers(t0=injection_parameters['geocent_time'])
+    from bilby.core.utils import nfft
+
+    waveform_generator = _get_waveform_generator()
+    injection_strain_time = waveform_generator.time_domain_strain(injection_parameters)
+    # FFT the time-domain strain rather than regenerating it via frequency_domain_strain
+    injection_strain = {
+        mode: nfft(strain, waveform_generator.sampling_frequency)[0]
+        for mode, strain in injection_strain_time.items()
+    }
+    ifos = load_interferometers(t0=injection_parameters["geocent_time"], rng=rng)
     ifos.inject_signal(
         parameters=injection_parameters,
         raise_error=False,
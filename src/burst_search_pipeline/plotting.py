@@ -4,7 +4,7 @@ import numpy as np
 from bilby.gw import utils as gwutils
 from gwpy.timeseries import TimeSeries
 
-np.random.seed(2)
+from .instrumentation import instrument
 
 DATA_COL = 'tab:gray'
 SIGNAL_COL = 'tab:orange'
@@ -68,7 +68,8 @@ def plot_time_and_freq_domain(ifo, time_signal, freq_signal, axes=None):
     return axes
 
 
+@instrument()
 def q_transform(time_data:np.ndarray, time_array:np.ndarray):
     t = TimeSeries(time_data, times=time_array)
     qtransform = t.q_transform()
-    qtransform.plot()
\ No newline at end of file
+    qtransform.plot()
@@ -0,0 +1,67 @@
+"""
+Pipeline-wide floating-point precision.
+
+In 'double' precision (the default) the pipeline's arrays are float64 and
+complex128. In 'single' precision the arrays that make up most of the
+memory and bandwidth are float32 and complex64. These are waveforms, noise,
+projected strain, SNR time series, whitened strain, qgrams and features.
+This halves their storage and speeds up the vectorised kernels. Select the
+precision with :func:`set_precision`, the :func:`precision` context manager
+or ``BURST_SEARCH_PRECISION=single``::
+
+    from burst_search_pipeline import precision
+    with precision.precision('single'):
+        batch = generate_waveforms(seeds, distances)
+
+Reductions that lose accuracy or underflow in single precision still run in
+double. Strain is ~1e-21 and PSDs ~1e-46, so ``|h|^2`` is below float32's
+smallest normal number. Inner products, template norms and PSD estimates
+therefore upcast before they square or sum.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+import numpy as np
+
+PRECISIONS: Dict[str, Tuple[type, type]] = {
+    "double": (np.float64, np.complex128),
+    "single": (np.float32, np.complex64),
+}
+
+_precision = "double"
+
+
+def set_precision(name: str):
+    """Use 'single' or 'double' precision from now on"""
+    global _precision
+    if name not in PRECISIONS:
+        raise ValueError(f"Unknown precision {name}, use one of {sorted(PRECISIONS)}")
+    _precision = name
+
+
+def get_precision() -> str:
+    return _precision
+
+
+@contextmanager
+def precision(name: str):
+    """Use precision ``name`` within the block"""
+    previous = get_precision()
+    set_precision(name)
+    try:
+        yield
+    finally:
+        set_precision(previous)
+
+
+def real_dtype() -> type:
+    return PRECISIONS[_precision][0]
+
+
+def complex_dtype() -> type:
+    return PRECISIONS[_precision][1]
+
+
+set_precision(os.environ.get("BURST_SEARCH_PRECISION", "double"))
@@ -0,0 +1,298 @@
+"""
+PSD estimation and whitening shared by the SNR, qgram and model stages.
+
+PSDs are estimated from stretches of background with Welch (mean) or
+median averaging, cached per detector and time window, and interpolated
+onto the rfft grid of the segments being analysed (256-sample simulated
+segments, 200-sample challenge blocks). A :class:`Whitener` then whitens
+whole batches in one vectorised pass.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .instrumentation import instrument
+from .precision import real_dtype
+from .waveform_generator import SAMPLING_FREQ
+
+CHI2_1_MEDIAN = 0.454936423119572  # scipy.stats.chi2(1).median()
+
+
+@instrument()
+def estimate_psd(
+    strain,
+    sampling_frequency: float = SAMPLING_FREQ,
+    nperseg: int = 1024,
+    method: str = "median",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    One-sided PSD of (... x n_samples) strain.
+
+    Parameters
+    ----------
+    method: str
+        'welch' (mean of the periodograms) or 'median' (robust to glitches
+        and signals in the background, with scipy's bias correction).
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray):
+        frequencies and (... x nperseg//2+1) PSDs
+    """
+    from scipy.signal import welch
+
+    if method not in ("welch", "median"):
+        raise ValueError(f"Unknown PSD method {method}, use 'welch' or 'median'")
+    return welch(
+        strain,
+        fs=sampling_frequency,
+        nperseg=nperseg,
+        axis=-1,
+        average="mean" if method == "welch" else "median",
+    )
+
+
+def _block_periodograms(blocks, sampling_frequency, window) -> np.ndarray:
+    """(n x n_ch x n_samples//2+1) one-sided periodograms of (n x n_samples x n_ch)"""
+    blocks = np.asarray(blocks, dtype=np.float64).transpose(0, 2, 1)
+    power = np.abs(np.fft.rfft(blocks * window, axis=-1)) ** 2
+    power *= 2 / (sampling_frequency * np.sum(window**2))
+    power[..., 0] /= 2
+    if blocks.shape[-1] % 2 == 0:
+        power[..., -1] /= 2
+    return power
+
+
+class BlockPSDAccumulator:
+    """
+    :func:`psd_from_blocks` over batches of blocks, one batch in memory at a time.
+
+    Each :meth:`add` reduces a batch to its mean (``'welch'``) or median
+    (``'median'``) periodogram. :meth:`psd` combines them: the count-weighted
+    mean, or the count-weighted median of the batch medians. The latter
+    equals the median of all blocks for a single batch, and is close to it
+    for batches of more than a few hundred blocks.
+    """
+
+    def __init__(
+        self,
+        sampling_frequency: float = SAMPLING_FREQ,
+        method: str = "median",
+        window: Optional[np.ndarray] = None,
+    ):
+        if method not in ("welch", "median"):
+            raise ValueError(f"Unknown PSD method {method}, use 'welch' or 'median'")
+        self.sampling_frequency = sampling_frequency
+        self.method = method
+        self.window = window
+        self.n_blocks = 0
+        self._averages: List[np.ndarray] = []
+        self._counts: List[int] = []
+
+    def add(self, blocks) -> "BlockPSDAccumulator":
+        """Add a batch of (n x n_samples x n_ch) blocks"""
+        if len(blocks) == 0:
+            return self
+        if self.window is None:
+            self.window = np.hanning(np.shape(blocks)[1])
+        power = _block_periodograms(blocks, self.sampling_frequency, self.window)
+        average = (
+            np.median(power, axis=0) if self.method == "median" else power.mean(axis=0)
+        )
+        self._averages.append(average)
+        self._counts.append(len(power))
+        self.n_blocks += len(power)
+        return self
+
+    def psd(self) -> np.ndarray:
+        """(n_ch x n_samples//2+1) PSD of the blocks added so far"""
+        if not self._averages:
+            raise ValueError("No blocks added")
+        averages, counts = np.array(self._averages), np.array(self._counts, dtype=float)
+        if self.method == "welch":
+            return np.tensordot(counts, averages, axes=1) / counts.sum()
+        order = np.argsort(averages, axis=0)
+        cumulative = np.cumsum(counts[order], axis=0)
+        middle = np.argmax(cumulative >= counts.sum() / 2, axis=0)[None]
+        # median / mean of a periodogram bin: ln(2) for chi^2_2, but the real
+        # DC and (even-length) Nyquist bins are chi^2_1
+        bias = np.full(averages.shape[-1], np.log(2))
+        bias[0] = CHI2_1_MEDIAN
+        if len(self.window) % 2 == 0:
+            bias[-1] = CHI2_1_MEDIAN
+        return (
+            np.take_along_axis(
+                np.take_along_axis(averages, order, axis=0), middle, axis=0
+            )[0]
+            / bias
+        )
+
+
+def psd_from_blocks(
+    blocks,
+    sampling_frequency: float = SAMPLING_FREQ,
+    method: str = "median",
+    window: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    PSD on the block rfft grid from many disjoint (n x n_samples x n_ch)
+    blocks, averaging their windowed periodograms (per channel). Always
+    computed in double, whatever the :mod:`precision`: squared raw strain
+    underflows float32. See :class:`BlockPSDAccumulator` for blocks that do
+    not fit in memory at once.
+    """
+    return BlockPSDAccumulator(sampling_frequency, method, window).add(blocks).psd()
+
+
+def interpolate_psd(frequencies, psd, target_frequencies) -> np.ndarray:
+    """
+    Log-log interpolation of (... x n_freq) PSDs onto ``target_frequencies`` (inf
+    outside their support)
+    """
+    psd = np.atleast_2d(psd)
+    valid = (frequencies > 0) & np.all(np.isfinite(psd) & (psd > 0), axis=0)
+    log_f = np.log(frequencies[valid])
+    with np.errstate(divide="ignore"):
+        log_target = np.log(target_frequencies)
+    out = np.array(
+        [np.exp(np.interp(log_target, log_f, np.log(p[valid]))) for p in psd]
+    )
+    out[
+        :,
+        (target_frequencies < frequencies[valid][0])
+        | (target_frequencies > frequencies[valid][-1]),
+    ] = np.inf
+    return out
+
+
+class Whitener:
+    """
+    Whiten batches of segments with fixed per-channel PSDs.
+
+    Parameters
+    ----------
+    psd: np.ndarray
+        (n_ch x n_samples//2+1) one-sided PSDs on the segment rfft grid (inf
+        or 0 for bins to drop).
+    n_samples: int
+        Segment length.
+    sampling_frequency: float
+    window: np.ndarray, optional
+        Window applied before the FFT (Hann by default).
+
+    Segments are whitened in the current :mod:`precision`. Whitened strain
+    is O(1), so single precision loses no range.
+    """
+
+    def __init__(
+        self,
+        psd,
+        n_samples: int,
+        sampling_frequency: float = SAMPLING_FREQ,
+        window: Optional[np.ndarray] = None,
+    ):
+        self.psd = np.atleast_2d(psd)
+        if self.psd.shape[-1] != n_samples // 2 + 1:
+            raise ValueError(
+                f"PSD has {self.psd.shape[-1]} bins, expected {n_samples // 2 + 1}"
+            )
+        self.n_samples = n_samples
+        self.sampling_frequency = sampling_frequency
+        self.window = np.hanning(n_samples) if window is None else window
+        valid = np.isfinite(self.psd) & (self.psd > 0)
+        # whitened Gaussian noise then has unit variance (up to the dropped bins)
+        window_norm = np.sqrt(np.mean(self.window**2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.inverse_asd = np.where(
+                valid, 1 / (np.sqrt(self.psd * sampling_frequency / 2) * window_norm), 0
+            )
+
+    @property
+    def frequency_array(self):
+        return np.fft.rfftfreq(self.n_samples, 1 / self.sampling_frequency)
+
+    @instrument()
+    def whiten_frequency_domain(self, strain, channel_axis: int = -2) -> np.ndarray:
+        """(n x n_ch x n_freq) whitened spectra, channels along ``channel_axis``"""
+        dtype = real_dtype()
+        strain = np.moveaxis(np.asarray(strain, dtype=dtype), channel_axis, -2)
+        white = np.fft.rfft(strain * self.window.astype(dtype, copy=False), axis=-1)
+        white *= self.inverse_asd.astype(dtype, copy=False)
+        return white
+
+    @instrument()
+    def whiten(self, strain, channel_axis: int = -2) -> np.ndarray:
+        """Whitened time series, same layout as ``strain``"""
+        white = np.fft.irfft(
+            self.whiten_frequency_domain(strain, channel_axis),
+            n=self.n_samples,
+            axis=-1,
+        )
+        return np.moveaxis(white, -2, channel_axis)
+
+
+class PSDCache:
+    """
+    PSDs estimated once per (detector, time window) and reused by every stage.
+
+    Parameters
+    ----------
+    sampling_frequency: float
+    nperseg: int
+        Welch segment length (sets the native frequency resolution).
+    method: str
+        See :func:`estimate_psd`.
+    """
+
+    def __init__(
+        self,
+        sampling_frequency: float = SAMPLING_FREQ,
+        nperseg: int = 1024,
+        method: str = "median",
+    ):
+        self.sampling_frequency = sampling_frequency
+        self.nperseg = nperseg
+        self.method = method
+        self._psds: Dict[Tuple[str, float, float], Tuple[np.ndarray, np.ndarray]] = {}
+        self._whiteners: Dict[tuple, Whitener] = {}
+
+    def __contains__(self, key):
+        return key in self._psds
+
+    def psd(
+        self, detector: str, start: float, end: float, strain=None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Native-resolution (frequencies, PSD) of ``detector`` over [start, end),
+        estimated from ``strain`` on a miss
+        """
+        key = (detector, start, end)
+        if key not in self._psds:
+            if strain is None:
+                raise KeyError(
+                    f"No PSD cached for {key} and no strain given to estimate it"
+                )
+            self._psds[key] = estimate_psd(
+                strain, self.sampling_frequency, self.nperseg, self.method
+            )
+        return self._psds[key]
+
+    def add(self, detector: str, start: float, end: float, frequencies, psd):
+        """Cache an externally computed PSD (e.g. a design curve)"""
+        self._psds[(detector, start, end)] = (np.asarray(frequencies), np.asarray(psd))
+
+    def whitener(
+        self, detectors: Sequence[str], start: float, end: float, n_samples: int
+    ) -> Whitener:
+        """Whitener for ``n_samples``-long segments of ``detectors`` over a window"""
+        key = (tuple(detectors), start, end, n_samples)
+        if key not in self._whiteners:
+            target = np.fft.rfftfreq(n_samples, 1 / self.sampling_frequency)
+            psds = [
+                interpolate_psd(*self.psd(d, start, end), target)[0] for d in detectors
+            ]
+            self._whiteners[key] = Whitener(
+                np.array(psds), n_samples, self.sampling_frequency
+            )
+        return self._whiteners[key]
@@ -0,0 +1,160 @@
+"""
+Band-limited rational resampling for batches and continuous streams.
+
+A :class:`Resampler` designs its Kaiser-windowed low-pass FIR filter once per
+rate pair and applies it polyphase (``scipy.signal.upfirdn``) along the last
+axis of (... x n_samples) arrays. A :class:`StreamingResampler` applies the
+same filter chunk by chunk, carrying the filter history across chunks, so
+that the concatenated output of a stream equals :meth:`Resampler.resample`
+of the whole stream.
+"""
+
+from fractions import Fraction
+from typing import Dict, Iterable, Iterator
+
+import numpy as np
+
+from .instrumentation import instrument
+
+# filter half-length per unit of max(up, down), as scipy.signal.resample_poly
+TAPS_PER_PHASE = 10
+KAISER_BETA = 5.0
+
+
+class Resampler:
+    """
+    Resample from ``input_rate`` to ``output_rate`` by the rational factor up / down.
+
+    Parameters
+    ----------
+    input_rate, output_rate: float
+        Sampling frequencies [Hz], with a rational ratio.
+    taps_per_phase: int
+        Filter half-length in units of ``max(up, down)``; longer filters
+        have a sharper anti-aliasing cutoff.
+    beta: float
+        Kaiser window shape parameter.
+    """
+
+    def __init__(
+        self,
+        input_rate: float,
+        output_rate: float,
+        taps_per_phase: int = TAPS_PER_PHASE,
+        beta: float = KAISER_BETA,
+    ):
+        from scipy.signal import firwin
+
+        ratio = Fraction(output_rate / input_rate).limit_denominator(1000)
+        if ratio * input_rate != output_rate:
+            raise ValueError(
+                f"{output_rate} / {input_rate} is not a ratio of integers up to 1000"
+            )
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.up, self.down = ratio.numerator, ratio.denominator
+        max_rate = max(self.up, self.down)
+        self.half_length = taps_per_phase * max_rate
+        # unit DC gain after upsampling by zero insertion
+        self.taps = (
+            firwin(2 * self.half_length + 1, 1 / max_rate, window=("kaiser", beta))
+            * self.up
+        )
+        self._shifted_taps: Dict[int, np.ndarray] = {}
+
+    def output_length(self, n_samples: int) -> int:
+        return -(-n_samples * self.up // self.down)
+
+    def _taps_shifted_by(self, shift: int) -> np.ndarray:
+        if shift not in self._shifted_taps:
+            self._shifted_taps[shift] = np.concatenate([np.zeros(shift), self.taps])
+        return self._shifted_taps[shift]
+
+    def _filter(self, x, first: int, n_out: int) -> np.ndarray:
+        """
+        ``n_out`` outputs of the filtered, upsampled ``x``, starting at index
+        ``first`` of the upsampled signal and spaced by ``down``. Samples
+        outside ``x`` are treated as zero.
+
+        Output ``m`` of the resampled signal is at index
+        ``m * down + half_length``: ``sum_k taps[k] u[m * down + half_length - k]``,
+        where ``u`` is ``x`` upsampled by zero insertion.
+        """
+        from scipy.signal import upfirdn
+
+        # delay the filter so that ``first`` falls on upfirdn's decimation grid
+        shift = -first % self.down
+        y = upfirdn(self._taps_shifted_by(shift), x, self.up, self.down, axis=-1)
+        offset = (first + shift) // self.down
+        return y[..., offset : offset + n_out]
+
+    @instrument()
+    def resample(self, x) -> np.ndarray:
+        """Resample (... x n_samples) ``x`` along its last axis, as ``resample_poly``"""
+        x = np.asarray(x)
+        return self._filter(x, self.half_length, self.output_length(x.shape[-1]))
+
+
+class StreamingResampler:
+    """
+    Chunk-by-chunk :class:`Resampler` for continuous (... x n_samples) streams.
+
+    Each chunk yields every output sample whose filter support has fully
+    arrived, and :meth:`flush` yields the rest. The concatenated outputs
+    equal :meth:`Resampler.resample` of the concatenated input.
+    """
+
+    def __init__(self, resampler: Resampler):
+        self.resampler = resampler
+        self.reset()
+
+    def reset(self):
+        self._buffer = None
+        self._buffer_start = 0  # stream index of the first buffered input sample
+        self._n_in = 0
+        self._n_out = 0
+
+    def _emit(self, last_output: int) -> np.ndarray:
+        r = self.resampler
+        n_out = max(0, last_output - self._n_out + 1)
+        first = self._n_out * r.down + r.half_length - self._buffer_start * r.up
+        y = r._filter(self._buffer, first, n_out)
+        self._n_out += n_out
+        # drop the inputs older than the oldest filter tap of the next output
+        oldest = (self._n_out * r.down + r.half_length - (len(r.taps) - 1)) // r.up
+        if oldest > self._buffer_start:
+            self._buffer = self._buffer[..., oldest - self._buffer_start :]
+            self._buffer_start = oldest
+        return y
+
+    @instrument()
+    def process(self, chunk) -> np.ndarray:
+        """Resampled outputs that ``chunk`` completes"""
+        chunk = np.asarray(chunk)
+        self._buffer = (
+            chunk
+            if self._buffer is None
+            else np.concatenate([self._buffer, chunk], axis=-1)
+        )
+        self._n_in += chunk.shape[-1]
+        r = self.resampler
+        # the last output whose newest filter tap falls on an input that has arrived
+        last_output = ((self._n_in - 1) * r.up - r.half_length) // r.down
+        return self._emit(last_output)
+
+    def flush(self) -> np.ndarray:
+        """The remaining outputs, treating the stream as zero after its end"""
+        if self._buffer is None:
+            return np.empty(0)
+        y = self._emit(self.resampler.output_length(self._n_in) - 1)
+        self.reset()
+        return y
+
+    def stream(self, chunks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """
+        Resample an iterable of chunks (e.g. ``streaming.simulated_noise_chunks``),
+        flushing at the end
+        """
+        for chunk in chunks:
+            yield self.process(chunk)
+        yield self.flush()
@@ -1,9 +1,226 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from ..features import FeatureExtractor
+from ..instrumentation import instrument
+from ..psd import Whitener
+from ..training_data import BurstType
+
+
+@dataclass
+class InferenceStats:
+    n_blocks: int = 0
+    n_batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """blocks / s"""
+        return self.n_blocks / self.seconds if self.seconds else 0.0
+
+    @property
+    def latency_per_block(self) -> float:
+        """s / block"""
+        return self.seconds / self.n_blocks if self.n_blocks else 0.0
+
+    @property
+    def latency_per_batch(self) -> float:
+        """s / batch"""
+        return self.seconds / self.n_batches if self.n_batches else 0.0
 
 
 class Model:
-    def fit(self, X, y):
-        pass
+    """
+    Anomaly scorer for (n_blocks x n_samples x n_channels) strain blocks.
+
+    Blocks are reduced to spectral features by a
+    :class:`~burst_search_pipeline.features.FeatureExtractor`. These are
+    whitened log band energies, STFT band energies and the peak
+    cross-detector correlation within the light travel time. The PSDs are
+    estimated from the training background unless a shared
+    :class:`~burst_search_pipeline.psd.Whitener` is given. Blocks are
+    scored by their Mahalanobis distance under a Gaussian fitted to the
+    background features. :meth:`predict` maps scores to the fraction of
+    background blocks scoring lower, i.e. a probability that the block is
+    anomalous.
+
+    Parameters
+    ----------
+    n_bands: int
+        Number of frequency bands per channel.
+    max_lag: int
+        Largest cross-correlation lag in samples (41 ~ 10 ms at 4096 Hz).
+    batch_size: int
+        Blocks processed per vectorised batch in :meth:`fit` and :meth:`predict`.
+    whitener: Whitener, optional
+        Whitener for the blocks, e.g. from a shared ``PSDCache``.
+    extractor: FeatureExtractor, optional
+        Feature extractor; built from ``n_bands``, ``max_lag`` and ``whitener`` if None.
+    """
+
+    def __init__(
+        self,
+        n_bands: int = 16,
+        max_lag: int = 41,
+        batch_size: int = 8192,
+        whitener: Whitener = None,
+        extractor: FeatureExtractor = None,
+    ):
+        self.batch_size = batch_size
+        self.extractor = extractor or FeatureExtractor(
+            n_bands=n_bands, max_lag=max_lag, whitener=whitener
+        )
+        self.stats = InferenceStats()
+        self._fitted = False
+
+    @property
+    def whitener(self) -> Whitener:
+        return self.extractor.whitener
+
+    @property
+    def fingerprint(self) -> str:
+        """Class name and a hash of the fitted background model, e.g. for checkpoints"""
+        if not self._fitted:
+            raise RuntimeError("Model.fit must be called before fingerprinting")
+        digest = hashlib.sha1()
+        for array in (self.mean, self._whitening, self._background_scores):
+            digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+        return f"{type(self).__qualname__}-{digest.hexdigest()[:16]}"
+
+    def check_block_length(self, n_samples: int, source: str = "blocks"):
+        """Raise a ValueError unless the model was fitted on ``n_samples``-sample blocks"""
+        if not self._fitted:
+            raise RuntimeError("Model.fit must be called before predicting")
+        if n_samples != self.extractor.n_samples:
+            raise ValueError(
+                f"Model was fitted on {self.extractor.n_samples}-sample blocks, "
+                f"but {source} have {n_samples} samples"
+            )
+
+    def whiten(self, X) -> np.ndarray:
+        """(n x c x f) whitened spectra of (n x s x c) blocks"""
+        return self.whitener.whiten_frequency_domain(X, channel_axis=-1)
+
+    def features(self, X) -> np.ndarray:
+        """(n x n_features) float32 features, see :class:`FeatureExtractor`"""
+        return self.extractor.transform(X)
+
+    def fit(self, X, y=None):
+        """
+        Fit the background model on (n x s x c) blocks; if labels are given
+        only the ``BurstType.NOISE`` blocks are used.
+
+        ``X`` may also be a re-iterable (e.g. a list) of block batches, or
+        of ``(blocks, labels)`` batches, or a function returning a fresh
+        iterator of them (e.g. ``TrainingStore.iter_minibatches``), for
+        backgrounds that do not fit in memory. Either way at most one batch (``batch_size`` blocks of an
+        array) is transformed at a time: the PSDs, the feature mean and the
+        covariance are accumulated over the batches, and the background is
+        scored batch by batch.
+        """
+        batches = self._fit_batches(X, y)
+        self.extractor.fit_batches(batches)
+        n, mean, scatter = 0, 0.0, 0.0
+        for batch in batches:
+            if len(batch) == 0:
+                continue
+            features = self.features(batch).astype(np.float64)
+            # Chan et al.'s pairwise update of the mean and scatter matrix
+            m = len(features)
+            batch_mean = features.mean(axis=0)
+            centred = features - batch_mean
+            delta = batch_mean - mean
+            scatter = (
+                scatter + centred.T @ centred + np.outer(delta, delta) * n * m / (n + m)
+            )
+            mean = mean + delta * m / (n + m)
+            n += m
+        if n < 2:
+            raise ValueError(f"Fitting needs at least 2 background blocks, got {n}")
+        self.mean = mean
+        covariance = scatter / (n - 1)
+        covariance += (
+            1e-6 * np.trace(covariance) / len(covariance) * np.eye(len(covariance))
+        )
+        self._whitening = np.linalg.cholesky(np.linalg.inv(covariance))
+        self._fitted = True
+        scores = [self.score(batch) for batch in batches if len(batch)]
+        self._background_scores = np.sort(np.concatenate(scores))
+        return self
+
+    def _fit_batches(self, X, y) -> "_BackgroundBatches":
+        if y is not None or isinstance(X, np.ndarray):
+            return _BackgroundBatches(X, y, self.batch_size)
+        if callable(X):
+            return _BackgroundBatches(X)
+        if iter(X) is X:
+            raise ValueError(
+                "Model.fit passes over the batches several times: "
+                "give a sequence, not an iterator"
+            )
+        return _BackgroundBatches(X)
+
+    @instrument()
+    def score(self, X) -> np.ndarray:
+        """(n,) Mahalanobis distance of each block's features from the background"""
+        z = (self.features(X) - self.mean) @ self._whitening
+        return np.sqrt(np.einsum("ij,ij->i", z, z))
+
+    def _probability(self, scores):
+        return np.searchsorted(self._background_scores, scores, side="right") / len(
+            self._background_scores
+        )
+
+    def predict_stream(self, batches: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """Lazily score an iterable of (n x s x c) batches, updating :attr:`stats`"""
+        if not self._fitted:
+            raise RuntimeError("Model.fit must be called before predicting")
+        for X in batches:
+            start = time.perf_counter()
+            probability = self._probability(self.score(X))
+            self.stats.seconds += time.perf_counter() - start
+            self.stats.n_blocks += len(probability)
+            self.stats.n_batches += 1
+            yield probability
+
+    def predict(self, X) -> np.ndarray:
+        """(n,) probability that each (s x c) block is anomalous"""
+        batches = (
+            X[start : start + self.batch_size]
+            for start in range(0, len(X), self.batch_size)
+        )
+        return np.concatenate(list(self.predict_stream(batches)) or [np.empty(0)])
+
+
+class _BackgroundBatches:
+    """
+    Re-iterable noise-only block batches: ``batch_size`` slices of an array, or
+    the given batches
+    """
+
+    def __init__(self, X, y=None, batch_size: int = None):
+        self.X, self.y, self.batch_size = X, y, batch_size
 
-    def predict(self, X):
-        pass
+    def __iter__(self) -> Iterator[np.ndarray]:
+        if self.batch_size is None:
+            for batch in self.X() if callable(self.X) else self.X:
+                yield (
+                    self._background(*batch)
+                    if isinstance(batch, tuple)
+                    else np.asarray(batch)
+                )
+            return
+        X = np.asarray(self.X)
+        y = None if self.y is None else np.asarray(self.y)
+        for start in range(0, len(X), self.batch_size):
+            stop = start + self.batch_size
+            yield self._background(X[start:stop], None if y is None else y[start:stop])
 
+    @staticmethod
+    def _background(X, y) -> np.ndarray:
+        X = np.asarray(X)
+        return X if y is None else X[np.asarray(y) == BurstType.NOISE.value]
@@ -0,0 +1,202 @@
+"""
+Fixed-shape batches in shared memory, handed between processes without copies.
+
+A :class:`BatchLayout` describes the arrays of one batch (e.g. strain,
+frequency-domain strain, qgrams, labels, injection parameters). Each array
+has a leading batch axis of at most ``batch_size`` rows. A
+:class:`SharedBatchPool` allocates one ``multiprocessing.shared_memory``
+segment holding ``n_slots`` such batches. Worker processes attach to the
+segment by name and fill a slot through numpy views of it. The consumer then
+reads the same slot through views, so no array is ever pickled. Slots are
+reused rather than allocated per batch: the owning process hands out free
+slots with :meth:`SharedBatchPool.acquire` and takes them back with
+:meth:`SharedBatchPool.release`::
+
+    fields = dict(strain=((2, 256), np.float32), labels=((), np.int64))
+    layout = BatchLayout(256, fields)
+    with SharedBatchPool(layout, n_slots=4) as pool:
+        slot = pool.acquire()
+        # in a worker: SharedBatchPool.attach(pool.handle).write(slot, batch)
+        batch = pool.views(slot, n_items)
+        ...
+        pool.release(slot)
+"""
+
+import weakref
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+_ALIGNMENT = 64  # bytes, so every array starts on a cache line
+
+
+@dataclass(frozen=True)
+class BatchLayout:
+    """
+    Arrays of a batch: ``fields`` maps each name to its per-item shape and dtype.
+
+    Array ``name`` of a batch of ``n <= batch_size`` items has shape
+    ``(n,) + fields[name][0]``.
+    """
+
+    batch_size: int
+    fields: Mapping[str, Tuple[Tuple[int, ...], str]]
+
+    def __post_init__(self):
+        # normalised so that layouts compare equal and pickle compactly
+        fields = {
+            name: (tuple(shape), np.dtype(dtype).str)
+            for name, (shape, dtype) in self.fields.items()
+        }
+        object.__setattr__(self, "fields", fields)
+
+    @classmethod
+    def from_batch(
+        cls, batch: Mapping[str, np.ndarray], batch_size: int = None
+    ) -> "BatchLayout":
+        """Layout of an example batch (``batch_size`` rows, the example's by default)"""
+        arrays = {name: np.asarray(value) for name, value in batch.items()}
+        batch_size = batch_size or len(next(iter(arrays.values())))
+        return cls(
+            batch_size, {name: (a.shape[1:], a.dtype) for name, a in arrays.items()}
+        )
+
+    def _offsets(self) -> Tuple[Dict[str, int], int]:
+        offsets, size = {}, 0
+        for name, (shape, dtype) in self.fields.items():
+            size = -(-size // _ALIGNMENT) * _ALIGNMENT
+            offsets[name] = size
+            size += (
+                self.batch_size
+                * int(np.prod(shape, dtype=int))
+                * np.dtype(dtype).itemsize
+            )
+        return offsets, size
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of one slot, a multiple of the alignment"""
+        return -(-max(self._offsets()[1], 1) // _ALIGNMENT) * _ALIGNMENT
+
+
+class SharedBatchPool:
+    """
+    ``n_slots`` batches of ``layout`` in one shared memory segment.
+
+    Parameters
+    ----------
+    layout: BatchLayout
+    n_slots: int
+    name: str, optional
+        Attach to the existing segment ``name`` rather than creating one
+        (see :meth:`attach`).
+    """
+
+    def __init__(self, layout: BatchLayout, n_slots: int, name: Optional[str] = None):
+        if n_slots < 1:
+            raise ValueError(f"n_slots must be at least 1, got {n_slots}")
+        self.layout = layout
+        self.n_slots = n_slots
+        self.owner = name is None
+        size = layout.nbytes * n_slots
+        self._shm = SharedMemory(
+            name=name, create=self.owner, size=size if self.owner else 0
+        )
+        # frombuffer holds a buffer export, so the mapping cannot be closed
+        # under a live view
+        self._buffer = np.frombuffer(self._shm.buf, np.uint8)
+        self._offsets = layout._offsets()[0]
+        self._free: List[int] = list(range(n_slots)) if self.owner else []
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def handle(self) -> tuple:
+        """Small picklable reference to the segment, see :meth:`attach`"""
+        return self.layout, self.n_slots, self.name
+
+    @classmethod
+    def attach(cls, handle: tuple) -> "SharedBatchPool":
+        """Attach to the pool with the given :attr:`handle` (e.g. in a worker)"""
+        layout, n_slots, name = handle
+        return cls(layout, n_slots, name=name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # slots -------------------------------------------------------------------
+
+    @property
+    def n_free(self) -> int:
+        return len(self._free)
+
+    def acquire(self) -> Optional[int]:
+        """A free slot, or None if all are in use (owner only)"""
+        return self._free.pop(0) if self._free else None
+
+    def release(self, slot: int):
+        """Return ``slot`` to the pool; views of it may then be overwritten"""
+        if slot in self._free or not 0 <= slot < self.n_slots:
+            raise ValueError(f"Slot {slot} is not in use")
+        self._free.append(slot)
+
+    # data ----------------------------------------------------------------------
+
+    def views(self, slot: int, n_items: int = None) -> Dict[str, np.ndarray]:
+        """Numpy views of the first ``n_items`` rows (all by default) of each array"""
+        n_items = self.layout.batch_size if n_items is None else n_items
+        if not 0 <= n_items <= self.layout.batch_size:
+            raise ValueError(
+                f"A slot holds up to {self.layout.batch_size} items, not {n_items}"
+            )
+        start = slot * self.layout.nbytes
+        views = {}
+        for name, (shape, dtype) in self.layout.fields.items():
+            offset = start + self._offsets[name]
+            nbytes = n_items * int(np.prod(shape, dtype=int)) * np.dtype(dtype).itemsize
+            views[name] = (
+                self._buffer[offset : offset + nbytes]
+                .view(dtype)
+                .reshape((n_items,) + shape)
+            )
+        return views
+
+    def write(self, slot: int, batch: Mapping[str, np.ndarray]) -> int:
+        """
+        Copy ``batch`` (every array of the layout, same number of rows) into ``slot``;
+        returns its rows
+        """
+        if set(batch) != set(self.layout.fields):
+            raise ValueError(
+                f"Batch has arrays {sorted(batch)}, "
+                f"the layout {sorted(self.layout.fields)}"
+            )
+        n_items = len(next(iter(batch.values())))
+        for name, view in self.views(slot, n_items).items():
+            view[...] = batch[name]
+        return n_items
+
+    def close(self):
+        """
+        Detach from the segment, and free it if this is the owning pool.
+
+        Views still referenced elsewhere keep the mapping alive until the last
+        of them is dropped.
+        """
+        if self._shm is None:
+            return
+        # every view holds the buffer's memoryview, which is released before
+        # its finalizers run
+        finalizer = weakref.finalize(self._buffer.base, self._shm.close)
+        finalizer.atexit = False
+        self._buffer = None
+        if self.owner:
+            self._shm.unlink()
+        self._shm = None
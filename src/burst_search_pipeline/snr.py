@@ -1,13 +1,11 @@
+from dataclasses import dataclass
+from typing import Dict, List
+
 import numpy as np
-import matplotlib.pyplot as plt
 
-import warnings
+from .instrumentation import instrument
+from .precision import complex_dtype
 
-import bilby
-import matplotlib.pyplot as plt
-import numpy as np
-from bilby.gw import utils as gwutils
-from starccato import generate_signals
 """
 # # single interferometer
 # snr_kwgs = dict(
@@ -19,28 +17,212 @@ from starccato import generate_signals
 # best_snr = compute_snr(signal=injection_strain['plus'], **snr_kwgs)
 """
 
-np.random.seed(2)
-
-
-
 
 def inner_product(aa, bb, frequency, PSD):
-    integrand = np.conj(aa) * bb / PSD
+    # divide by the (float64) PSD first: the product of two complex64 strains underflows
+    integrand = np.conj(aa) * (bb / PSD)
     df = frequency[1] - frequency[0]
     integral = np.sum(integrand) * df
     return 4. * np.real(integral)
 
 
+@instrument()
 def compute_snr(signal, data, freq, psd, fmask):
     """
 
     matched_filter_snr = <d|h> / sqrt <h|h>
     optimal_snr = sqrt <h|h>
     """
-    d = data.astype(np.complex128)[fmask]
-    h = signal.astype(np.complex128)[fmask]
+    d = np.asarray(data)[fmask]
+    h = np.asarray(signal)[fmask]
     dh = inner_product(d, h, freq[fmask], psd[fmask])
     hh = inner_product(h, h, freq[fmask], psd[fmask])
     o_snr = np.sqrt(hh)
     mf_snr = dh / o_snr
     return mf_snr, o_snr
+
+
+def batch_inner_product(aa, bb, frequency, PSD):
+    """Vectorised :func:`inner_product` along the last (frequency) axis.
+
+    ``aa`` and ``bb`` broadcast against each other, so a single data segment
+    can be scored against an (N_templates x N_freq) stack in one call.
+    Single-precision inputs are accumulated in double, as in :func:`inner_product`.
+    """
+    integrand = np.conj(aa) * (bb / PSD)
+    df = frequency[1] - frequency[0]
+    return 4.0 * np.real(np.sum(integrand, axis=-1) * df)
+
+
+@dataclass
+class BankSNR:
+    """Matched-filter and optimal SNRs of a template bank, shape (N_ifo, N_templates)"""
+
+    matched_filter_snr: np.ndarray
+    optimal_snr: np.ndarray
+    detectors: List[str]
+
+
+class TemplateBankFilter:
+    """
+    Score a stack of frequency-domain templates against data in one pass.
+
+    The data are whitened once into a weight vector ``w = 4 df conj(d) / S``
+    (zero outside ``fmask``) so that ``<d|h> = Re(H @ w)`` for the whole bank.
+    Template norms ``<h|h>`` only depend on the PSD, so they are cached and
+    reused across segments that share one.
+
+    The templates and SNR time series are stored in the current
+    :mod:`precision`. The weights are double, so overlaps and norms are
+    accumulated in double either way.
+
+    Parameters
+    ----------
+    templates: array-like
+        (N_templates x N_freq) frequency-domain templates, on the same
+        frequency grid as the data (e.g. ``WAVEFORM_GENERATOR.frequency_array``).
+    chunk_size: int, optional
+        Maximum number of templates scored at once, bounding the size of the
+        temporaries. Scores the whole bank at once if None.
+    """
+
+    def __init__(self, templates, chunk_size: int = None):
+        self.templates = np.atleast_2d(np.asarray(templates, dtype=complex_dtype()))
+        self.chunk_size = chunk_size or len(self.templates)
+        self._norm_cache: Dict[bytes, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.templates)
+
+    def _chunks(self):
+        for start in range(0, len(self.templates), self.chunk_size):
+            yield slice(start, start + self.chunk_size)
+
+    @staticmethod
+    def _psd_weights(freq, psd, fmask):
+        """4 df / S on the masked bins, zero elsewhere"""
+        df = freq[1] - freq[0]
+        weights = np.zeros(len(freq))
+        weights[fmask] = 4.0 * df / psd[fmask]
+        return weights
+
+    def whiten_data(self, data, freq, psd, fmask):
+        """Weight vector ``w`` such that ``<d|h> = Re(h @ w)``"""
+        return np.conj(np.asarray(data)) * self._psd_weights(freq, psd, fmask)
+
+    def template_norms(self, freq, psd, fmask):
+        """<h|h> for every template (cached per PSD / frequency mask)"""
+        key = psd[fmask].tobytes() + fmask.tobytes() + freq[:2].tobytes()
+        if key not in self._norm_cache:
+            weights = self._psd_weights(freq, psd, fmask)
+            hh = np.empty(len(self.templates))
+            for chunk in self._chunks():
+                h = self.templates[chunk].astype(np.complex128)
+                hh[chunk] = (h.real**2 + h.imag**2) @ weights
+            self._norm_cache[key] = hh
+        return self._norm_cache[key]
+
+    @instrument()
+    def filter(self, data, freq, psd, fmask):
+        """
+        Matched-filter and optimal SNR of every template against one segment.
+
+        Equivalent to calling :func:`compute_snr` once per template.
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray):
+            matched_filter_snr and optimal_snr, each of shape (N_templates,)
+        """
+        w = self.whiten_data(data, freq, psd, fmask)
+        dh = np.empty(len(self.templates))
+        for chunk in self._chunks():
+            dh[chunk] = np.real(self.templates[chunk] @ w)
+        o_snr = np.sqrt(self.template_norms(freq, psd, fmask))
+        return dh / o_snr, o_snr
+
+    @instrument()
+    def filter_time_series(self, data, freq, psd, fmask, n_samples: int = None):
+        """
+        Complex SNR of every template as a function of (cyclic) time shift.
+
+        One inverse FFT per template replaces a :func:`compute_snr` call per
+        trial shift: ``snr[i, k]`` scores the data against template ``i``
+        delayed by ``k / (n_samples * df)`` seconds. The real part is the
+        matched-filter SNR (``snr[:, 0].real`` equals :meth:`filter`), the
+        modulus is maximised over the template phase.
+
+        Parameters
+        ----------
+        n_samples: int, optional
+            Length of the time series, defaults to the number of time-domain
+            samples of the rfft grid, ``2 * (len(freq) - 1)``.
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray):
+            complex SNR of shape (N_templates, n_samples) and the optimal SNR
+            of shape (N_templates,)
+        """
+        n_samples = n_samples or 2 * (len(freq) - 1)
+        weighted_data = np.conj(self.whiten_data(data, freq, psd, fmask))
+        o_snr = np.sqrt(self.template_norms(freq, psd, fmask))
+        snr = np.empty((len(self.templates), n_samples), dtype=complex_dtype())
+        for chunk in self._chunks():
+            integrand = np.conj(self.templates[chunk]) * weighted_data
+            snr[chunk] = np.fft.ifft(integrand, n=n_samples, axis=-1) * n_samples
+        snr /= o_snr[:, None]
+        return snr, o_snr
+
+    def filter_interferometers(self, ifos) -> BankSNR:
+        """
+        Score the bank against every detector in ``ifos`` (e.g.
+        ``IFODataStream.interferometers``)
+        """
+        mf_snr, o_snr = [], []
+        for ifo in ifos:
+            mf, opt = self.filter(
+                data=ifo.strain_data.frequency_domain_strain,
+                freq=ifo.strain_data.frequency_array,
+                psd=ifo.power_spectral_density_array,
+                fmask=ifo.strain_data.frequency_mask,
+            )
+            mf_snr.append(mf)
+            o_snr.append(opt)
+        return BankSNR(np.array(mf_snr), np.array(o_snr), [ifo.name for ifo in ifos])
+
+
+@instrument()
+def snr_time_series(signal, data, freq, psd, fmask):
+    """
+    Complex matched-filter SNR of ``signal`` against ``data`` for every cyclic
+    time shift (see :meth:`TemplateBankFilter.filter_time_series`).
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray, float):
+        time shifts [s], complex SNR time series, optimal SNR
+    """
+    snr, o_snr = TemplateBankFilter(signal).filter_time_series(data, freq, psd, fmask)
+    shifts = np.arange(snr.shape[-1]) / (snr.shape[-1] * (freq[1] - freq[0]))
+    return shifts, snr[0], o_snr[0]
+
+
+def find_snr_peaks(snr, threshold):
+    """
+    Local maxima of ``|snr|`` above ``threshold`` in (N_templates x N_shifts)
+    SNR time series, treating the shift axis as cyclic.
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray, np.ndarray):
+        template index, shift index and ``|snr|`` of every peak
+    """
+    abs_snr = np.abs(np.atleast_2d(snr))
+    is_peak = (
+        (abs_snr >= threshold)
+        & (abs_snr >= np.roll(abs_snr, 1, axis=-1))
+        & (abs_snr > np.roll(abs_snr, -1, axis=-1))
+    )
+    template_idx, shift_idx = np.nonzero(is_peak)
+    return template_idx, shift_idx, abs_snr[template_idx, shift_idx]
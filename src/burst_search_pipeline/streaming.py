@@ -0,0 +1,357 @@
+"""
+Streaming search over continuous strain.
+
+Long strain (simulated noise, a ``.npy`` file or an HDF5/GWOSC file) is read
+in fixed-size chunks, cut into overlapping windowed segments of
+``N_TIMESTAMPS`` samples and passed to search stages (matched filtering,
+``search.model.Model``) that emit :class:`Trigger` s. Only one chunk plus the
+overlap is ever held in memory, whatever the length of the input.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .instrumentation import instrument
+from .psd import Whitener
+from .snr import TemplateBankFilter, find_snr_peaks
+from .waveform_generator import N_TIMESTAMPS, SAMPLING_FREQ
+
+
+@dataclass
+class Trigger:
+    time: float  # seconds from the start of the stream
+    statistic: float
+    channel: int
+    template: int = -1
+    stage: str = ""
+
+
+@dataclass
+class SegmentBatch:
+    """Segments cut from one chunk of the stream"""
+
+    start_times: np.ndarray  # (n_seg,) seconds from the start of the stream
+    strain: np.ndarray  # (n_seg x n_ch x N) windowed strain
+    # (n_seg x n_ch x N//2+1), rfft / sampling_frequency
+    frequency_domain_strain: np.ndarray
+    whitened_strain: np.ndarray  # (n_seg x n_ch x N) whitened strain
+    # (start, stop) offsets [s] of the part of each segment no other segment owns
+    valid: tuple
+    end_time: float = np.inf  # end of the stream [s], once the last chunk has been read
+
+
+# sources -----------------------------------------------------------------
+
+
+def array_chunks(strain, chunk_size: int = 64 * SAMPLING_FREQ) -> Iterator[np.ndarray]:
+    """Chunks of an (n_ch x n_samples) array, memmap or ``.npy`` path (memory-mapped)"""
+    if isinstance(strain, str):
+        strain = np.load(strain, mmap_mode="r")
+    strain = strain if strain.ndim == 2 else strain[None, :]
+    for start in range(0, strain.shape[-1], chunk_size):
+        yield np.asarray(strain[:, start : start + chunk_size], dtype=np.float64)
+
+
+def hdf5_chunks(
+    paths: Sequence[str],
+    dataset: str = "strain/Strain",
+    chunk_size: int = 64 * SAMPLING_FREQ,
+) -> Iterator[np.ndarray]:
+    """Chunks read in lockstep from one HDF5 file per channel (GWOSC layout default)"""
+    import h5py
+
+    files = [h5py.File(path, "r") for path in paths]
+    try:
+        datasets = [f[dataset] for f in files]
+        n_samples = min(len(d) for d in datasets)
+        for start in range(0, n_samples, chunk_size):
+            stop = min(start + chunk_size, n_samples)
+            yield np.stack([d[start:stop] for d in datasets]).astype(np.float64)
+    finally:
+        for f in files:
+            f.close()
+
+
+def simulated_noise_chunks(
+    duration: float,
+    ifo_names: Sequence[str] = ("H1", "L1"),
+    chunk_size: int = 64 * SAMPLING_FREQ,
+    sampling_frequency: float = SAMPLING_FREQ,
+    rng: np.random.Generator = None,
+) -> Iterator[np.ndarray]:
+    """
+    Coloured Gaussian noise from the detectors' design PSDs, generated chunk
+    by chunk (independent realisations, so chunk boundaries are not
+    continuous).
+    """
+    from bilby.gw.detector import InterferometerList
+
+    rng = rng or np.random.default_rng()
+    ifos = InterferometerList(list(ifo_names))
+    frequencies = np.fft.rfftfreq(chunk_size, 1 / sampling_frequency)
+    psds = np.array(
+        [
+            ifo.power_spectral_density.power_spectral_density_interpolated(frequencies)
+            for ifo in ifos
+        ]
+    )
+    asd = np.sqrt(np.where(np.isfinite(psds), psds, 0))
+    n_total = int(round(duration * sampling_frequency))
+    chunk_duration = chunk_size / sampling_frequency
+    for start in range(0, n_total, chunk_size):
+        white = rng.normal(0, 0.5 * chunk_duration**0.5, (2,) + asd.shape)
+        noise = (white[0] + 1j * white[1]) * asd
+        noise[:, 0] = 0
+        strain = np.fft.irfft(noise, n=chunk_size, axis=-1) * sampling_frequency
+        yield strain[:, : n_total - start]
+
+
+def design_psd(
+    ifo_names: Sequence[str] = ("H1", "L1"),
+    n_samples: int = N_TIMESTAMPS,
+    sampling_frequency: float = SAMPLING_FREQ,
+) -> np.ndarray:
+    """(n_ch x n_samples//2+1) design PSDs on the segment rfft grid (inf off support)"""
+    from bilby.gw.detector import InterferometerList
+
+    frequencies = np.fft.rfftfreq(n_samples, 1 / sampling_frequency)
+    return np.array(
+        [
+            ifo.power_spectral_density.power_spectral_density_interpolated(frequencies)
+            for ifo in InterferometerList(list(ifo_names))
+        ]
+    )
+
+
+# segmentation --------------------------------------------------------------
+
+
+class SegmentStream:
+    """
+    Cut a stream of (n_ch x n) chunks into overlapping, windowed, whitened segments.
+
+    Parameters
+    ----------
+    psd: np.ndarray
+        (n_ch x N//2+1) one-sided PSD of each channel on the segment rfft grid.
+    segment_length: int
+        Samples per segment (N).
+    stride: int
+        Samples between the starts of consecutive segments.
+    sampling_frequency: float
+    window: np.ndarray, optional
+        Window applied to every segment (Tukey(alpha=0.1) by default).
+    highpass: float, optional
+        Corner frequency [Hz] of a Butterworth high-pass applied to the stream
+        (with its state carried across chunks) before segmentation. Short
+        segments have too coarse a frequency resolution to whiten the steep
+        low-frequency noise wall without leakage. Disabled if None.
+    """
+
+    def __init__(
+        self,
+        psd,
+        segment_length: int = N_TIMESTAMPS,
+        stride: int = N_TIMESTAMPS // 2,
+        sampling_frequency: float = SAMPLING_FREQ,
+        window: Optional[np.ndarray] = None,
+        highpass: Optional[float] = 20.0,
+    ):
+        if not 0 < stride <= segment_length:
+            raise ValueError(f"stride must be in (0, {segment_length}], got {stride}")
+        # scipy.signal takes ~1 s to import, so only on first use
+        from scipy.signal import butter
+        from scipy.signal.windows import tukey
+
+        self.segment_length = segment_length
+        self.stride = stride
+        self.sampling_frequency = sampling_frequency
+        self.window = tukey(segment_length, alpha=0.1) if window is None else window
+        self.psd = np.atleast_2d(psd)
+        self.whitener = Whitener(
+            self.psd, segment_length, sampling_frequency, window=self.window
+        )
+        self._buffer = np.empty((0, self.psd.shape[0], segment_length))
+        self._spectrum = np.empty(
+            (0, self.psd.shape[0], segment_length // 2 + 1), complex
+        )
+        self._sos = (
+            None
+            if highpass is None
+            else butter(8, highpass, "highpass", fs=sampling_frequency, output="sos")
+        )
+        # zeros ahead of the stream, so that the first segment owns its first sample
+        self.lead = (segment_length - stride) // 2
+        self.valid = (
+            self.lead / sampling_frequency,
+            (self.lead + stride) / sampling_frequency,
+        )
+
+    def _windowed(self, n_segments, n_channels):
+        # reuse the segment buffers across chunks, growing them only when needed
+        if self._buffer.shape[0] < n_segments or self._buffer.shape[1] != n_channels:
+            self._buffer = np.empty((n_segments, n_channels, self.segment_length))
+            self._spectrum = np.empty(
+                (n_segments, n_channels, self.segment_length // 2 + 1), complex
+            )
+        return self._buffer[:n_segments], self._spectrum[:n_segments]
+
+    def _batch(self, data, n_segments, consumed, end_time=np.inf) -> SegmentBatch:
+        views = np.lib.stride_tricks.sliding_window_view(
+            data, self.segment_length, axis=-1
+        )
+        strain, spectrum = self._windowed(n_segments, data.shape[0])
+        np.multiply(
+            views[:, :: self.stride][:, :n_segments].transpose(1, 0, 2),
+            self.window,
+            out=strain,
+        )
+        # numpy < 2 has no out= for the FFTs, so only the whitening product
+        # reuses a buffer
+        fd = np.fft.rfft(strain, axis=-1)
+        np.multiply(fd, self.whitener.inverse_asd, out=spectrum)
+        whitened = np.fft.irfft(spectrum, n=self.segment_length, axis=-1)
+        fd /= self.sampling_frequency
+        starts = (
+            consumed - self.lead + np.arange(n_segments) * self.stride
+        ) / self.sampling_frequency
+        return SegmentBatch(starts, strain, fd, whitened, self.valid, end_time)
+
+    def segments(self, chunks: Iterable[np.ndarray]) -> Iterator[SegmentBatch]:
+        """
+        Yield a :class:`SegmentBatch` per chunk (its arrays are reused: copy to keep).
+
+        Every sample of the stream lies in the :attr:`valid` part of exactly
+        one segment: the stream is padded with zeros ahead of its first
+        sample, and after the last chunk a final batch covers the rest of
+        the stream, padded with zeros. Segment ``k`` starts ``k * stride -
+        lead`` samples into the stream (negative for the first ones).
+        """
+        from scipy.signal import sosfilt
+
+        carry = None
+        consumed = 0  # samples of the zero-padded stream before ``carry``
+        n_samples = 0  # samples of the stream read so far
+        filter_state = None
+        for chunk in chunks:
+            chunk = np.atleast_2d(chunk)
+            if self._sos is not None:
+                if filter_state is None:
+                    filter_state = np.zeros((len(self._sos), chunk.shape[0], 2))
+                chunk, filter_state = sosfilt(
+                    self._sos, chunk, axis=-1, zi=filter_state
+                )
+            if carry is None:
+                carry = np.zeros((chunk.shape[0], self.lead))
+            n_samples += chunk.shape[-1]
+            data = np.concatenate([carry, chunk], axis=-1)
+            n_segments = max(
+                0, (data.shape[-1] - self.segment_length) // self.stride + 1
+            )
+            if n_segments:
+                yield self._batch(data, n_segments, consumed)
+            next_start = n_segments * self.stride
+            carry = data[:, next_start:].copy()
+            consumed += next_start
+
+        # flush: segments owning the samples after the last full segment
+        n_remaining = -(-n_samples // self.stride) - consumed // self.stride
+        if n_remaining > 0:
+            length = (n_remaining - 1) * self.stride + self.segment_length
+            data = np.concatenate(
+                [carry, np.zeros((carry.shape[0], length - carry.shape[-1]))], axis=-1
+            )
+            yield self._batch(
+                data, n_remaining, consumed, n_samples / self.sampling_frequency
+            )
+
+
+# stages --------------------------------------------------------------------
+
+
+def matched_filter_stage(
+    bank: TemplateBankFilter,
+    psd,
+    fmask,
+    threshold: float,
+    sampling_frequency: float = SAMPLING_FREQ,
+) -> Callable[[SegmentBatch], List[Trigger]]:
+    """Stage emitting SNR peaks above ``threshold`` for every template and channel"""
+    psd = np.atleast_2d(psd)
+
+    @instrument("streaming.matched_filter_stage")
+    def stage(batch: SegmentBatch) -> List[Trigger]:
+        triggers = []
+        n_freq = batch.frequency_domain_strain.shape[-1]
+        freq = np.arange(n_freq) * sampling_frequency / (2 * (n_freq - 1))
+        for start, segment in zip(batch.start_times, batch.frequency_domain_strain):
+            for channel, data in enumerate(segment):
+                snr, _ = bank.filter_time_series(data, freq, psd[channel], fmask)
+                template, shift, peak = find_snr_peaks(snr, threshold)
+                offset = shift / sampling_frequency
+                # each time belongs to exactly one overlapping segment
+                keep = (
+                    (offset >= batch.valid[0])
+                    & (offset < batch.valid[1])
+                    & (start + offset < batch.end_time)
+                )
+                triggers += [
+                    Trigger(start + o, p, channel, t, "matched_filter")
+                    for t, o, p in zip(template[keep], offset[keep], peak[keep])
+                ]
+        return triggers
+
+    return stage
+
+
+def model_stage(model, threshold: float) -> Callable[[SegmentBatch], List[Trigger]]:
+    """
+    Stage scoring segments with ``model.predict``.
+
+    The model whitens blocks with its own PSDs, so it is given the windowed,
+    un-whitened segments ((n_seg x N x n_ch)) and must have been fitted on
+    ``N``-sample blocks.
+    """
+
+    @instrument("streaming.model_stage")
+    def stage(batch: SegmentBatch) -> List[Trigger]:
+        model.check_block_length(batch.strain.shape[-1], "stream segments")
+        scores = np.asarray(model.predict(batch.strain.transpose(0, 2, 1)))
+        return [
+            Trigger(start + batch.valid[0], score, -1, stage="model")
+            for start, score in zip(batch.start_times, scores)
+            if score >= threshold
+        ]
+
+    return stage
+
+
+class StreamingSearch:
+    """
+    Run search stages over overlapping segments of a continuous stream.
+
+    Parameters
+    ----------
+    stream: SegmentStream
+    stages: sequence of callables
+        Each maps a :class:`SegmentBatch` to a list of :class:`Trigger` s
+        (see :func:`matched_filter_stage` and :func:`model_stage`).
+    """
+
+    def __init__(
+        self,
+        stream: SegmentStream,
+        stages: Sequence[Callable[[SegmentBatch], List[Trigger]]],
+    ):
+        self.stream = stream
+        self.stages = list(stages)
+        self.n_segments = 0
+
+    def run(self, chunks: Iterable[np.ndarray]) -> Iterator[Trigger]:
+        """Lazily yield the triggers of every stage, in stream order per chunk"""
+        for batch in self.stream.segments(chunks):
+            self.n_segments += len(batch.start_times)
+            for stage in self.stages:
+                yield from stage(batch)
@@ -0,0 +1,271 @@
+"""
+Template bank placement and hierarchical (coarse-to-fine) bank search.
+
+Candidate waveforms (e.g. Starccato waveforms for a range of seeds) are
+reduced to a bank in which every candidate has a match of at least
+``minimal_match`` with some template. The match is the noise-weighted
+overlap of :func:`snr.inner_product`, maximised over time shift and phase.
+The bank is then clustered: templates are assigned to coarse centroids
+placed at a lower ``coarse_match``. A search filters the centroids first and
+only refines the clusters whose centroid comes close to the threshold.
+"""
+
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+from .instrumentation import instrument
+from .snr import TemplateBankFilter
+
+# bytes of the complex temporaries of one _matches chunk
+MATCH_CHUNK_BYTES = 64 * 2**20
+
+
+def _whitened_unit_templates(templates, freq, psd, fmask) -> np.ndarray:
+    """Templates scaled by sqrt(4 df / S) and normalised: overlaps are dot products"""
+    weights = TemplateBankFilter._psd_weights(freq, psd, fmask)
+    whitened = np.atleast_2d(np.asarray(templates, dtype=np.complex128)) * np.sqrt(
+        weights
+    )
+    norms = np.linalg.norm(whitened, axis=-1, keepdims=True)
+    if np.any(norms == 0):
+        raise ValueError("templates must have non-zero power within the frequency mask")
+    return whitened / norms
+
+
+def _matches(a, b, n_samples: int, max_bytes: int = MATCH_CHUNK_BYTES) -> np.ndarray:
+    """
+    (len(a) x len(b)) matches of unit whitened templates, maximised over cyclic
+    time shift and phase. Rows of ``a`` are filtered in chunks whose
+    (rows x len(b) x N) product and overlap stay within ``max_bytes``.
+    """
+    matches = np.empty((len(a), len(b)))
+    row_bytes = (
+        len(b) * (np.shape(a)[-1] + n_samples) * np.dtype(np.complex128).itemsize
+    )
+    chunk_size = max(1, max_bytes // max(row_bytes, 1))
+    for start in range(0, len(a), chunk_size):
+        product = np.conj(a[start : start + chunk_size, None, :]) * b[None, :, :]
+        overlap = np.fft.ifft(product, n=n_samples, axis=-1) * n_samples
+        matches[start : start + chunk_size] = np.abs(overlap).max(axis=-1)
+    return matches
+
+
+def overlap_matrix(
+    templates,
+    freq,
+    psd,
+    fmask,
+    n_samples: int = None,
+    max_bytes: int = MATCH_CHUNK_BYTES,
+) -> np.ndarray:
+    """(N x N) matches between ``templates``, maximised over time shift and phase"""
+    unit = _whitened_unit_templates(templates, freq, psd, fmask)
+    return _matches(unit, unit, n_samples or 2 * (len(freq) - 1), max_bytes)
+
+
+def _greedy_cover(
+    unit,
+    minimal_match: float,
+    n_samples: int,
+    block_size: int,
+    max_bytes: int = MATCH_CHUNK_BYTES,
+) -> np.ndarray:
+    """
+    Indices of a subset of ``unit`` such that every row matches one of them to
+    ``minimal_match``
+    """
+    kept: List[int] = []
+    for start in range(0, len(unit), block_size):
+        block = unit[start : start + block_size]
+        covered = np.zeros(len(block), dtype=bool)
+        if kept:
+            covered = (
+                _matches(block, unit[kept], n_samples, max_bytes).max(axis=1)
+                >= minimal_match
+            )
+        within = _matches(block, block, n_samples, max_bytes) >= minimal_match
+        for i in range(len(block)):
+            if not covered[i]:
+                kept.append(start + i)
+                covered |= within[i]
+    return np.array(kept, dtype=int)
+
+
+@instrument()
+def place_templates(
+    candidates,
+    freq,
+    psd,
+    fmask,
+    minimal_match: float = 0.97,
+    block_size: int = 256,
+    n_samples: int = None,
+    max_bytes: int = MATCH_CHUNK_BYTES,
+) -> np.ndarray:
+    """
+    Greedily reduce ``candidates`` to a bank with the given minimal match.
+
+    Candidates are visited in order. Each one is kept unless it matches a
+    template already in the bank by at least ``minimal_match``. Candidates
+    are compared in blocks against the bank, so the cost scales with
+    N_candidates x N_bank rather than N_candidates^2. The match temporaries
+    are bounded by ``max_bytes``.
+
+    Returns
+    -------
+    np.ndarray:
+        indices of the kept candidates
+    """
+    unit = _whitened_unit_templates(candidates, freq, psd, fmask)
+    return _greedy_cover(
+        unit, minimal_match, n_samples or 2 * (len(freq) - 1), block_size, max_bytes
+    )
+
+
+@dataclass
+class BankSearchResult:
+    snr: float  # |SNR| of the loudest template, maximised over time shift and phase
+    template: int  # index into HierarchicalTemplateBank.templates
+    shift: int  # time-shift index of the peak
+    n_filtered: int  # templates filtered to find it
+
+
+class HierarchicalTemplateBank:
+    """
+    A template bank clustered under coarse centroids.
+
+    Parameters
+    ----------
+    templates: np.ndarray
+        (N_templates x N_freq) frequency-domain templates.
+    centroids: np.ndarray
+        Indices of the templates used as coarse centroids.
+    assignment: np.ndarray
+        (N_templates,) position in ``centroids`` of each template's cluster.
+    coarse_match: float
+        Minimal match between a template and its centroid.
+    seeds: np.ndarray, optional
+        Waveform seed of each template.
+    """
+
+    def __init__(
+        self, templates, centroids, assignment, coarse_match: float, seeds=None
+    ):
+        self.templates = np.atleast_2d(np.asarray(templates, dtype=np.complex128))
+        self.centroids = np.asarray(centroids, dtype=int)
+        self.assignment = np.asarray(assignment, dtype=int)
+        self.coarse_match = coarse_match
+        self.seeds = None if seeds is None else np.asarray(seeds)
+        self.members = [
+            np.flatnonzero(self.assignment == c) for c in range(len(self.centroids))
+        ]
+        self._coarse = TemplateBankFilter(self.templates[self.centroids])
+        self._fine = [TemplateBankFilter(self.templates[m]) for m in self.members]
+
+    def __len__(self):
+        return len(self.templates)
+
+    @classmethod
+    def build(
+        cls,
+        candidates,
+        freq,
+        psd,
+        fmask,
+        minimal_match: float = 0.97,
+        coarse_match: float = 0.8,
+        seeds: Sequence[int] = None,
+        block_size: int = 256,
+        max_bytes: int = MATCH_CHUNK_BYTES,
+    ) -> "HierarchicalTemplateBank":
+        """
+        Place a bank at ``minimal_match`` from ``candidates`` and cluster it at
+        ``coarse_match``
+        """
+        n_samples = 2 * (len(freq) - 1)
+        unit = _whitened_unit_templates(candidates, freq, psd, fmask)
+        kept = _greedy_cover(unit, minimal_match, n_samples, block_size, max_bytes)
+        centroids = _greedy_cover(
+            unit[kept], coarse_match, n_samples, block_size, max_bytes
+        )
+        assignment = _matches(
+            unit[kept], unit[kept][centroids], n_samples, max_bytes
+        ).argmax(axis=1)
+        # a centroid always belongs to its own cluster
+        assignment[centroids] = np.arange(len(centroids))
+        candidates = np.atleast_2d(candidates)
+        return cls(
+            candidates[kept],
+            centroids,
+            assignment,
+            coarse_match,
+            seeds=None if seeds is None else np.asarray(seeds)[kept],
+        )
+
+    @instrument()
+    def search(self, data, freq, psd, fmask, threshold: float) -> BankSearchResult:
+        """
+        Loudest template for one segment, refining only promising clusters.
+
+        A template with SNR ``rho`` gives its centroid an SNR of about
+        ``coarse_match * rho``. So only clusters whose centroid reaches
+        ``coarse_match * threshold`` are filtered in full. The result is
+        the loudest centroid if no cluster qualifies.
+        """
+        coarse_snr, _ = self._coarse.filter_time_series(data, freq, psd, fmask)
+        coarse_abs = np.abs(coarse_snr)
+        peak = np.unravel_index(coarse_abs.argmax(), coarse_abs.shape)
+        best = BankSearchResult(
+            coarse_abs[peak], self.centroids[peak[0]], peak[1], len(self.centroids)
+        )
+        for cluster in np.flatnonzero(
+            coarse_abs.max(axis=1) >= self.coarse_match * threshold
+        ):
+            snr, _ = self._fine[cluster].filter_time_series(data, freq, psd, fmask)
+            snr = np.abs(snr)
+            best.n_filtered += len(snr)
+            i, shift = np.unravel_index(snr.argmax(), snr.shape)
+            if snr[i, shift] > best.snr:
+                best.snr, best.template, best.shift = (
+                    snr[i, shift],
+                    self.members[cluster][i],
+                    shift,
+                )
+        return best
+
+    def search_exhaustive(self, data, freq, psd, fmask) -> BankSearchResult:
+        """Loudest template of the whole bank, for comparison with :meth:`search`"""
+        snr = np.abs(
+            TemplateBankFilter(self.templates).filter_time_series(
+                data, freq, psd, fmask
+            )[0]
+        )
+        i, shift = np.unravel_index(snr.argmax(), snr.shape)
+        return BankSearchResult(snr[i, shift], i, shift, len(self.templates))
+
+
+def build_supernova_bank(
+    seeds,
+    freq,
+    psd,
+    fmask,
+    minimal_match: float = 0.97,
+    coarse_match: float = 0.8,
+    waveforms=None,
+) -> HierarchicalTemplateBank:
+    """
+    Hierarchical bank of Starccato waveforms for the given ``seeds``.
+
+    ``waveforms`` maps (seeds, distances) to a ``WaveformBatch`` and
+    defaults to :func:`waveform_generator.generate_waveforms`. The bank is
+    normalisation-independent, so the waveforms are generated at 1 kpc.
+    """
+    if waveforms is None:
+        from .waveform_generator import generate_waveforms as waveforms
+    seeds = np.asarray(seeds)
+    candidates = waveforms(seeds, 1.0).frequency_domain_strain
+    return HierarchicalTemplateBank.build(
+        candidates, freq, psd, fmask, minimal_match, coarse_match, seeds=seeds
+    )
@@ -1,6 +1,17 @@
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import repeat
+from typing import Sequence, Tuple
 import numpy as np
-from .lvk_interferometers import load_interferometers_with_injection
+from .glitch import generate_glitches
+from .instrumentation import pool_map
+from .lvk_interferometers import load_interferometers
+from .precision import PRECISIONS, get_precision, real_dtype
+from .qtransform import QTransformEngine
+from .resample import Resampler
+from .training_store import TrainingStore
+from .waveform_generator import N_TIMESTAMPS, generate_waveforms
 
 from enum import Enum
 
@@ -10,14 +21,238 @@ class BurstType(Enum):
     SIGNAL = 2
 
 
+GEOCENT_TIME = 1126259642.413
+DISTANCE_RANGE = (1.0, 10.0)  # kpc
+LABEL_PROBABILITIES = (1 / 3, 1 / 3, 1 / 3)
+N_IFOS = 2
+# injection-parameter columns (NaN where they don't apply to a sample)
+PARAMETER_NAMES = (
+    "luminosity_distance",
+    "ra",
+    "dec",
+    "psi",
+    "seed",
+    "glitch_family",
+    "central_frequency",
+    "snr",
+)
+
+
+def sample_rng(seed: int, index: int) -> np.random.Generator:
+    """Independent generator for sample ``index`` of the set generated from ``seed``"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+
+
+def _random_injection_parameters(rng: np.random.Generator) -> dict:
+    return dict(
+        luminosity_distance=rng.uniform(*DISTANCE_RANGE),
+        geocent_time=GEOCENT_TIME,
+        ra=rng.uniform(0, 2 * np.pi),
+        dec=np.arcsin(rng.uniform(-1, 1)),
+        psi=rng.uniform(0, np.pi),
+        seed=int(rng.integers(2**31)),
+    )
+
+
+def generate_strain(label: BurstType, rng: np.random.Generator) -> np.ndarray:
+    """(N_ifo x N_TIMESTAMPS) time-domain strain of one sample of class ``label``"""
+    return _generate_sample(label, rng)[0]
+
+
+def _generate_sample(
+    label: BurstType, rng: np.random.Generator
+) -> Tuple[np.ndarray, dict]:
+    params = {}
+    if label == BurstType.SIGNAL:
+        params = _random_injection_parameters(rng)
+        ifos = load_interferometers(t0=params["geocent_time"], rng=rng)
+        waveform = generate_waveforms([params["seed"]], params["luminosity_distance"])
+        polarization = waveform.frequency_domain_strain[0]
+        ifos.inject_signal(
+            parameters=params,
+            raise_error=False,
+            injection_polarizations={"plus": polarization, "cross": polarization},
+        )
+    else:
+        ifos = load_interferometers(t0=GEOCENT_TIME, rng=rng)
+        if label == BurstType.GLITCH:
+            # glitches are local to a single detector
+            glitch = generate_glitches(1, rng)
+            ifo = ifos[rng.integers(len(ifos))]
+            ifo.strain_data.frequency_domain_strain += glitch.frequency_domain_strain[0]
+            params = dict(
+                glitch_family=glitch.family[0],
+                central_frequency=glitch.central_frequency[0],
+                snr=glitch.snr[0],
+            )
+    return np.array([ifo.strain_data.time_domain_strain for ifo in ifos]), params
+
+
+def _generate_chunk(seed, indices, label_probabilities, dtype=np.float64):
+    labels = np.empty(len(indices), dtype=int)
+    strain = np.empty((len(indices), N_IFOS, N_TIMESTAMPS), dtype=dtype)
+    params = np.full((len(indices), len(PARAMETER_NAMES)), np.nan)
+    for i, index in enumerate(indices):
+        rng = sample_rng(seed, index)
+        labels[i] = rng.choice(len(BurstType), p=label_probabilities)
+        strain[i], sample_params = _generate_sample(BurstType(labels[i]), rng)
+        params[i] = [sample_params.get(name, np.nan) for name in PARAMETER_NAMES]
+    return strain, labels, params
+
+
+def generate_training_set(
+    n_samples: int,
+    seed: int = 0,
+    n_workers: int = 1,
+    label_probabilities: Sequence[float] = LABEL_PROBABILITIES,
+    chunk_size: int = 256,
+    start: int = 0,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Generate labelled NOISE/GLITCH/SIGNAL samples across a process pool.
+
+    Every sample draws its label and data from its own generator
+    (:func:`sample_rng`), so the output is bit-identical whatever the number
+    of workers or the chunk size. The strain is returned in the current
+    :mod:`precision`.
+
+    Parameters
+    ----------
+    n_samples: int
+        Number of samples to generate.
+    seed: int
+        Root seed of the set.
+    n_workers: int
+        Number of worker processes (generates in-process if 1).
+    label_probabilities: sequence of float
+        Probability of each :class:`BurstType`, in order of their values.
+    chunk_size: int
+        Number of samples per task submitted to the pool.
+    start: int
+        Index of the first sample, to extend a set generated earlier.
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray, np.ndarray):
+        (n_samples x N_ifo x N_TIMESTAMPS) strain, the (n_samples,) label
+        values and the (n_samples x len(PARAMETER_NAMES)) injection parameters
+    """
+    stop = start + n_samples
+    chunks = [
+        range(i, min(i + chunk_size, stop)) for i in range(start, stop, chunk_size)
+    ]
+    dtype = real_dtype()
+    if n_workers == 1:
+        results = [
+            _generate_chunk(seed, chunk, label_probabilities, dtype) for chunk in chunks
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(
+                pool_map(
+                    pool,
+                    _generate_chunk,
+                    repeat(seed),
+                    chunks,
+                    repeat(label_probabilities),
+                    repeat(dtype),
+                )
+            )
+    if not results:
+        return _generate_chunk(seed, [], label_probabilities, dtype)
+    return tuple(np.concatenate(field) for field in zip(*results))
+
+
+@lru_cache(maxsize=None)
+def _qtransform_engine(precision: str) -> QTransformEngine:
+    return QTransformEngine(dtype=PRECISIONS[precision][0])
+
+
+def default_qtransform_engine() -> QTransformEngine:
+    """Q-transform engine (current precision) used for qgrams unless one is given"""
+    return _qtransform_engine(get_precision())
+
+
+def compute_qgrams(
+    strain: np.ndarray, engine: QTransformEngine = None, resampler: Resampler = None
+) -> np.ndarray:
+    """
+    (n_samples x N_ifo x F x T) qgrams of a batch of (n_samples x N_ifo x
+    N_TIMESTAMPS) strains.
+
+    If a ``resampler`` is given the strains are first resampled to its
+    output rate, which ``engine`` must then be configured for.
+    """
+    if resampler is not None:
+        strain = resampler.resample(strain)
+    return (engine or default_qtransform_engine()).transform(strain)
+
+
+def write_training_set(
+    path: str,
+    n_samples: int,
+    seed: int = 0,
+    n_workers: int = 1,
+    label_probabilities: Sequence[float] = LABEL_PROBABILITIES,
+    batch_size: int = 4096,
+    qgram_engine: QTransformEngine = None,
+) -> TrainingStore:
+    """
+    Generate a training set into the :class:`TrainingStore` at ``path`` in
+    batches of ``batch_size``.
+
+    Resumable: samples already in the store are skipped, and since every
+    sample is seeded by its index the resumed set is identical to one
+    written in a single go. Qgrams are computed and stored alongside the
+    strain if a ``qgram_engine`` is given. Resuming with a different seed,
+    label probabilities, batch size or qgram setting raises a ValueError.
+    """
+    store = TrainingStore(
+        path,
+        strain_shape=(N_IFOS, N_TIMESTAMPS),
+        qgram_shape=(
+            (N_IFOS,) + qgram_engine.shape if qgram_engine is not None else None
+        ),
+        param_names=PARAMETER_NAMES,
+        chunk_size=batch_size,
+        attrs=dict(seed=seed, label_probabilities=list(label_probabilities)),
+    )
+    has_qgrams = "qgram" in store.fields
+    if has_qgrams != (qgram_engine is not None):
+        raise ValueError(
+            f"Store at {path} {'holds' if has_qgrams else 'has no'} qgrams: "
+            f"resume it {'with' if has_qgrams else 'without'} a qgram_engine"
+        )
+    with store:
+        for start in range(len(store), n_samples, batch_size):
+            strain, labels, params = generate_training_set(
+                min(batch_size, n_samples - start),
+                seed=seed,
+                n_workers=n_workers,
+                label_probabilities=label_probabilities,
+                start=start,
+            )
+            qgram = (
+                compute_qgrams(strain, qgram_engine)
+                if qgram_engine is not None
+                else None
+            )
+            store.append(strain, labels, params, qgram=qgram)
+    return store
+
+
 @dataclass
 class TrainingData:
     label: BurstType
-    time_domain_strain: np.ndarray
+    time_domain_strain: np.ndarray = None
     qgram: np.ndarray = None
 
     def generate(self, seed=0):
-        np.random.seed(seed)
-        IFO_data = load_interferometers_with_injection()
+        self.time_domain_strain = generate_strain(
+            self.label, np.random.default_rng(seed)
+        )
+        return self
 
+    def compute_qgram(self, engine: QTransformEngine = None):
+        self.qgram = compute_qgrams(self.time_domain_strain, engine)
         return self
@@ -0,0 +1,279 @@
+"""
+Chunked on-disk store for training sets.
+
+A store is a directory of ``.npy`` chunks plus a ``manifest.json``::
+
+    store/
+        manifest.json
+        strain_00000.npy   (n x N_ifo x N_TIMESTAMPS)
+        labels_00000.npy   (n,)
+        params_00000.npy   (n x N_params)
+        qgram_00000.npy    (n x N_ifo x F x T, optional)
+        ...
+
+Chunks are written atomically and only listed in the manifest once complete,
+so an interrupted writer can reopen the store and keep appending. Readers
+memory-map the chunks, so only the rows that are actually sampled are read.
+"""
+
+import json
+import os
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .precision import real_dtype
+
+MANIFEST = "manifest.json"
+
+
+def _to_json(value):
+    """``value`` as it reads back from the manifest (e.g. tuples as lists)"""
+    return json.loads(json.dumps(value))
+
+
+class TrainingStore:
+    """
+    Append-friendly, memory-mapped training set.
+
+    Parameters
+    ----------
+    path: str
+        Store directory, created if it does not exist.
+    strain_shape: tuple, optional
+        Per-sample strain shape (required when creating a store).
+    qgram_shape: tuple, optional
+        Per-sample qgram shape, if qgrams are stored.
+    param_names: sequence of str, optional
+        Names of the injection-parameter columns (none by default).
+    chunk_size: int, optional
+        Number of samples per chunk file (4096 by default).
+    attrs: dict, optional
+        Extra JSON-serialisable metadata (e.g. the generation seed).
+    dtype: str, optional
+        Dtype the strain and qgrams are stored in, fixed when the store is
+        created (the current :mod:`precision` if None).
+
+    When reopening an existing store, every argument that is given (and
+    every key of ``attrs``) must match what the store was created with,
+    otherwise a ValueError is raised.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        strain_shape: Tuple[int, ...] = None,
+        qgram_shape: Tuple[int, ...] = None,
+        param_names: Sequence[str] = None,
+        chunk_size: int = None,
+        attrs: Optional[Dict] = None,
+        dtype: str = None,
+    ):
+        self.path = path
+        requested = dict(
+            strain_shape=None if strain_shape is None else list(strain_shape),
+            qgram_shape=None if qgram_shape is None else list(qgram_shape),
+            param_names=None if param_names is None else list(param_names),
+            chunk_size=chunk_size,
+            dtype=None if dtype is None else np.dtype(dtype).name,
+        )
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+            # arguments given when reopening must describe the existing store
+            for key, value in requested.items():
+                stored = self.dtype.name if key == "dtype" else self.manifest[key]
+                if value is not None and _to_json(value) != stored:
+                    raise ValueError(f"Store at {path} has {key}={stored}, not {value}")
+            for key, value in (attrs or {}).items():
+                if _to_json(value) != self.manifest["attrs"].get(key):
+                    raise ValueError(
+                        f"Store at {path} has attrs[{key!r}]="
+                        f"{self.manifest['attrs'].get(key)}, not {value}"
+                    )
+        else:
+            if strain_shape is None:
+                raise ValueError(
+                    f"No store at {path}: strain_shape is required to create one"
+                )
+            os.makedirs(path, exist_ok=True)
+            self.manifest = dict(
+                requested,
+                param_names=requested["param_names"] or [],
+                chunk_size=chunk_size or 4096,
+                chunk_lengths=[],
+                attrs=_to_json(attrs or {}),
+                dtype=requested["dtype"] or np.dtype(real_dtype()).name,
+            )
+            self._write_manifest()
+        self._pending = []
+        self._chunks = {}
+        self._offsets = np.cumsum([0] + self.manifest["chunk_lengths"])
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        fields = ("strain", "labels", "params")
+        return (
+            fields + ("qgram",) if self.manifest["qgram_shape"] is not None else fields
+        )
+
+    @property
+    def dtype(self) -> np.dtype:
+        # stores written before the dtype was recorded hold float64
+        return np.dtype(self.manifest.get("dtype", "float64"))
+
+    @property
+    def param_names(self):
+        return self.manifest["param_names"]
+
+    @property
+    def attrs(self):
+        return self.manifest["attrs"]
+
+    def _chunk_path(self, field, chunk):
+        return os.path.join(self.path, f"{field}_{chunk:05d}.npy")
+
+    def _write_manifest(self):
+        tmp = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+
+    # writing ---------------------------------------------------------------
+
+    def append(self, strain, labels, params=None, qgram=None):
+        """Buffer a batch of samples, writing every full chunk to disk"""
+        n = len(labels)
+        batch = dict(
+            strain=np.asarray(strain, dtype=self.dtype).reshape(
+                n, *self.manifest["strain_shape"]
+            ),
+            labels=np.asarray(labels, dtype=np.int64),
+            params=(
+                np.full((n, len(self.param_names)), np.nan)
+                if params is None
+                else np.asarray(params, dtype=np.float64).reshape(
+                    n, len(self.param_names)
+                )
+            ),
+        )
+        if self.manifest["qgram_shape"] is not None:
+            if qgram is None:
+                raise ValueError("This store holds qgrams, but none were given")
+            batch["qgram"] = np.asarray(qgram, dtype=self.dtype).reshape(
+                n, *self.manifest["qgram_shape"]
+            )
+        self._pending.append(batch)
+        chunk_size = self.manifest["chunk_size"]
+        while sum(len(b["labels"]) for b in self._pending) >= chunk_size:
+            pending = {
+                k: np.concatenate([b[k] for b in self._pending]) for k in self.fields
+            }
+            self._write_chunk({k: v[:chunk_size] for k, v in pending.items()})
+            self._pending = [{k: v[chunk_size:] for k, v in pending.items()}]
+
+    def flush(self):
+        """Write any buffered samples as a (possibly short) chunk"""
+        if self._pending and sum(len(b["labels"]) for b in self._pending):
+            self._write_chunk(
+                {k: np.concatenate([b[k] for b in self._pending]) for k in self.fields}
+            )
+        self._pending = []
+
+    def _write_chunk(self, batch):
+        chunk = len(self.manifest["chunk_lengths"])
+        for field, values in batch.items():
+            # np.save appends .npy to names without it, so keep the suffix last
+            tmp = self._chunk_path(field, chunk)[:-4] + ".tmp.npy"
+            np.save(tmp, values)
+            os.replace(tmp, self._chunk_path(field, chunk))
+        self.manifest["chunk_lengths"].append(len(batch["labels"]))
+        self._offsets = np.cumsum([0] + self.manifest["chunk_lengths"])
+        self._write_manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    # reading ---------------------------------------------------------------
+
+    def chunk(self, field: str, chunk: int) -> np.ndarray:
+        """Memory-mapped view of one chunk of ``field``"""
+        key = (field, chunk)
+        if key not in self._chunks:
+            self._chunks[key] = np.load(self._chunk_path(field, chunk), mmap_mode="r")
+        return self._chunks[key]
+
+    def read(
+        self, indices, fields: Sequence[str] = ("strain", "labels")
+    ) -> Dict[str, np.ndarray]:
+        """Gather the given sample indices (in the order given) into in-memory arrays"""
+        indices = np.asarray(indices, dtype=np.int64)
+        if not len(self):
+            raise IndexError(f"Store at {self.path} is empty")
+        if len(indices) and (indices.min() < 0 or indices.max() >= len(self)):
+            raise IndexError(
+                f"Sample index out of range for a store of {len(self)} samples"
+            )
+        chunk_ids = np.searchsorted(self._offsets, indices, side="right") - 1
+        out = {}
+        for field in fields:
+            first = self.chunk(field, 0)
+            values = np.empty((len(indices),) + first.shape[1:], dtype=first.dtype)
+            for chunk in np.unique(chunk_ids):
+                rows = np.flatnonzero(chunk_ids == chunk)
+                local = indices[rows] - self._offsets[chunk]
+                # sorted reads keep mmap access sequential within a chunk
+                order = np.argsort(local)
+                values[rows[order]] = self.chunk(field, chunk)[local[order]]
+            out[field] = values
+        return out
+
+    def sample_minibatch(
+        self,
+        batch_size: int,
+        rng: np.random.Generator = None,
+        fields: Sequence[str] = ("strain", "labels"),
+    ) -> Dict[str, np.ndarray]:
+        """Uniformly sample ``batch_size`` samples without replacement"""
+        rng = rng or np.random.default_rng()
+        return self.read(
+            rng.choice(len(self), size=min(batch_size, len(self)), replace=False),
+            fields,
+        )
+
+    def iter_minibatches(
+        self,
+        batch_size: int,
+        shuffle: bool = True,
+        rng: np.random.Generator = None,
+        x_field: str = "strain",
+        channels_last: bool = False,
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Yield ``(X, y)`` minibatches covering the store once.
+
+        ``X`` is (n x N_ifo x ...) as stored, or (n x ... x N_ifo) if
+        ``channels_last``, the block layout of ``search.model.Model``, which
+        can be fitted straight from the store::
+
+            batches = partial(store.iter_minibatches, 4096, channels_last=True)
+            model = Model().fit(batches)
+        """
+        order = (
+            (rng or np.random.default_rng()).permutation(len(self))
+            if shuffle
+            else np.arange(len(self))
+        )
+        for start in range(0, len(self), batch_size):
+            batch = self.read(
+                order[start : start + batch_size], fields=(x_field, "labels")
+            )
+            X = batch[x_field]
+            yield (np.moveaxis(X, 1, -1) if channels_last else X), batch["labels"]
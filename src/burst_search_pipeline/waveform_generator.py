@@ -1,12 +1,15 @@
+import hashlib
+import os
 import warnings
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
 
-import bilby
-import matplotlib.pyplot as plt
 import numpy as np
-from bilby.gw import utils as gwutils
-from starccato import generate_signals
 
-np.random.seed(2)
+from .instrumentation import instrument
+from .precision import complex_dtype, real_dtype
 
 DATA_COL = 'tab:gray'
 SIGNAL_COL = 'tab:orange'
@@ -47,6 +50,8 @@ def __supernova(time_array, luminosity_distance, **kwargs):
         A dictionary containing the plus and cross components of the signal.
     """
 
+    from starccato import generate_signals
+
     n = kwargs.get('n', 1)
     seed = kwargs.get('seed', 0)
     waveform = generate_signals(n=n, seed=seed)
@@ -54,17 +59,19 @@ def __supernova(time_array, luminosity_distance, **kwargs):
     if n == 1:
         waveform = waveform[0]
 
-    # waveforms generated at 10kpc, so scale to the luminosity distance
-    scaling = 1e-21 * (10.0 / luminosity_distance)
-    waveform = scaling * waveform
+    waveform = _distance_scaling(luminosity_distance) * waveform
     return {'plus': waveform, 'cross': waveform}
 
 
+def _distance_scaling(luminosity_distance):
+    # waveforms generated at 10kpc, so scale to the luminosity distance
+    return 1e-21 * (10.0 / luminosity_distance)
 
 
-
-
+@lru_cache(maxsize=None)
 def _get_waveform_generator():
+    import bilby
+
     # Create the waveform_generator using a supernova source function
     waveform_generator = bilby.gw.waveform_generator.WaveformGenerator(
         duration=DURATION,
@@ -76,4 +83,207 @@ def _get_waveform_generator():
     return waveform_generator
 
 
-WAVEFORM_GENERATOR = _get_waveform_generator()
+def __getattr__(name):
+    # WAVEFORM_GENERATOR is built on first access, importing bilby and
+    # starccato only then
+    if name == "WAVEFORM_GENERATOR":
+        return _get_waveform_generator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@dataclass
+class WaveformBatch:
+    """
+    Stacked waveforms: (n x N_TIMESTAMPS) time-domain and (n x N_TIMESTAMPS//2+1)
+    rfft strains
+    """
+
+    time_domain_strain: np.ndarray
+    frequency_domain_strain: np.ndarray
+    time_array: np.ndarray
+    frequency_array: np.ndarray
+
+    def __len__(self):
+        return len(self.time_domain_strain)
+
+
+def _latent_vectors(seeds) -> np.ndarray:
+    """Latent vectors drawn exactly as ``generate_signals(n=1, seed=seed)`` does"""
+    import torch
+    from starccato.defaults import DEVICE, NZ
+
+    latent = np.empty((len(seeds), NZ), dtype=np.float32)
+    for i, seed in enumerate(seeds):
+        torch.manual_seed(int(seed))
+        latent[i] = torch.randn((1, NZ, 1), device=DEVICE)[0, :, 0].cpu().numpy()
+    return latent
+
+
+@instrument()
+def generate_waveforms(
+    seeds, luminosity_distances, weights_file: Optional[str] = None
+) -> WaveformBatch:
+    """
+    Generate a batch of supernova waveforms with one generator call and one FFT.
+
+    Row ``i`` matches what :code:`WAVEFORM_GENERATOR` returns for
+    ``seed=seeds[i]`` and ``luminosity_distance=luminosity_distances[i]``,
+    without a bilby parameter conversion and generator round-trip per waveform.
+
+    Parameters
+    ----------
+    seeds: array-like of int
+        Starccato seeds, one per waveform.
+    luminosity_distances: float or array-like
+        Distances in kpc, broadcast against ``seeds``.
+    weights_file: str, optional
+        Starccato generator weights (the package default if None).
+
+    Returns
+    -------
+    WaveformBatch
+        strains in the current :mod:`precision`
+    """
+    from starccato import generate_signals
+
+    seeds = np.atleast_1d(seeds)
+    distances = np.broadcast_to(luminosity_distances, seeds.shape)
+    raw = generate_signals(
+        latent_vector=_latent_vectors(seeds), weights_file=weights_file
+    )
+    time_domain_strain = (_distance_scaling(distances)[:, None] * raw).astype(
+        real_dtype(), copy=False
+    )
+    frequency_domain_strain = np.fft.rfft(time_domain_strain, axis=-1) / SAMPLING_FREQ
+    return WaveformBatch(
+        time_domain_strain=time_domain_strain,
+        frequency_domain_strain=frequency_domain_strain,
+        time_array=np.arange(N_TIMESTAMPS) / SAMPLING_FREQ,
+        frequency_array=np.linspace(0, SAMPLING_FREQ / 2, N_TIMESTAMPS // 2 + 1),
+    )
+
+
+class WaveformCache:
+    """
+    LRU cache of Starccato waveforms keyed by (seed, generator config).
+
+    A waveform only depends on the distance through an overall amplitude, so
+    the cache stores each seed once at 1 kpc (time-domain strain and its
+    rfft) and rescales on lookup: sweeping distances costs one generator call
+    per seed rather than one per (seed, distance) pair.
+
+    Parameters
+    ----------
+    max_bytes: int
+        Memory cap; least recently used entries are evicted beyond it.
+    cache_dir: str, optional
+        If given, entries are also persisted as ``.npz`` files in this
+        directory and reloaded before falling back to the generator.
+    weights_file: str, optional
+        Starccato generator weights (the package default if None).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 2**20,
+        cache_dir: Optional[str] = None,
+        weights_file: Optional[str] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.weights_file = weights_file
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        config = f"{weights_file or 'default'}-{SAMPLING_FREQ}-{N_TIMESTAMPS}"
+        self._config_tag = hashlib.sha1(config.encode()).hexdigest()[:12]
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, seed):
+        return self._key(seed) in self._entries
+
+    def _key(self, seed):
+        return int(seed), self.weights_file
+
+    def _disk_path(self, seed):
+        return os.path.join(self.cache_dir, f"{self._config_tag}_{int(seed)}.npz")
+
+    def _insert(self, seed, time_domain_strain, frequency_domain_strain):
+        self._entries[self._key(seed)] = (time_domain_strain, frequency_domain_strain)
+        self.nbytes += time_domain_strain.nbytes + frequency_domain_strain.nbytes
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, (td, fd) = self._entries.popitem(last=False)
+            self.nbytes -= td.nbytes + fd.nbytes
+
+    def _load_from_disk(self, seed):
+        if self.cache_dir is None or not os.path.exists(self._disk_path(seed)):
+            return False
+        with np.load(self._disk_path(seed)) as entry:
+            self._insert(
+                seed, entry["time_domain_strain"], entry["frequency_domain_strain"]
+            )
+        return True
+
+    def _fill(self, seeds):
+        unique = list(dict.fromkeys(int(s) for s in seeds))
+        missing = [s for s in unique if self._key(s) not in self._entries]
+        self.hits += len(seeds) - len(missing)
+        # hits become most recent, so that inserting the misses cannot evict them
+        for s in unique:
+            if self._key(s) in self._entries:
+                self._entries.move_to_end(self._key(s))
+        missing = [s for s in missing if not self._load_from_disk(s)]
+        self.misses += len(missing)
+        if not missing:
+            return
+        batch = generate_waveforms(missing, 1.0, weights_file=self.weights_file)
+        for seed, td, fd in zip(
+            missing, batch.time_domain_strain, batch.frequency_domain_strain
+        ):
+            if self.cache_dir is not None:
+                np.savez(
+                    self._disk_path(seed),
+                    time_domain_strain=td,
+                    frequency_domain_strain=fd,
+                )
+            # copies: a row view would keep the whole batch alive, uncounted by nbytes
+            self._insert(seed, td.copy(), fd.copy())
+
+    @instrument()
+    def generate_waveforms(self, seeds, luminosity_distances) -> WaveformBatch:
+        """Cached equivalent of :func:`generate_waveforms`"""
+        seeds = np.atleast_1d(seeds)
+        # scaling relative to the 1 kpc entries
+        scaling = _distance_scaling(
+            np.broadcast_to(luminosity_distances, seeds.shape)
+        ) / _distance_scaling(1.0)
+        time_domain_strain = np.empty((len(seeds), N_TIMESTAMPS), dtype=real_dtype())
+        frequency_domain_strain = np.empty(
+            (len(seeds), N_TIMESTAMPS // 2 + 1), dtype=complex_dtype()
+        )
+        # seeds are looked up in chunks, so a batch larger than the memory cap
+        # still works
+        chunk_size = max(
+            1,
+            self.max_bytes
+            // (time_domain_strain[0].nbytes + frequency_domain_strain[0].nbytes),
+        )
+        for start in range(0, len(seeds), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            self._fill(seeds[chunk])
+            for i, seed in enumerate(seeds[chunk], start=start):
+                td, fd = self._entries[self._key(seed)]
+                self._entries.move_to_end(self._key(seed))
+                time_domain_strain[i] = scaling[i] * td
+                frequency_domain_strain[i] = scaling[i] * fd
+        return WaveformBatch(
+            time_domain_strain=time_domain_strain,
+            frequency_domain_strain=frequency_domain_strain,
+            time_array=np.arange(N_TIMESTAMPS) / SAMPLING_FREQ,
+            frequency_array=np.linspace(0, SAMPLING_FREQ / 2, N_TIMESTAMPS // 2 + 1),
+        )
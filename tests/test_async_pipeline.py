@@ -0,0 +1,81 @@
+import os
+import time
+from functools import partial
+
+import numpy as np
+import pytest
+
+from burst_search_pipeline.async_pipeline import AsyncPipeline, TrainingBatchProducer
+from burst_search_pipeline.shared_batch import BatchLayout
+from burst_search_pipeline.training_data import generate_training_set
+
+
+def _produce(index, directory=None, delay=0.0, fail_on=None):
+    if directory is not None:
+        open(os.path.join(directory, str(index)), "w").close()
+    if index == fail_on:
+        raise ValueError(f"bad batch {index}")
+    time.sleep(delay)
+    return dict(
+        strain=np.full((4, 2, 8), index, dtype=np.float32),
+        labels=np.arange(4) + 4 * index,
+    )
+
+
+LAYOUT = BatchLayout.from_batch(_produce(0))
+
+
+def test_batches_arrive_in_order_with_backpressure(tmp_path):
+    produce = partial(_produce, directory=str(tmp_path), delay=0.01)
+    with AsyncPipeline(
+        produce, n_batches=12, n_workers=3, max_pending=4, layout=LAYOUT
+    ) as pipeline:
+        for i, batch in enumerate(pipeline):
+            assert batch["strain"].dtype == np.float32
+            np.testing.assert_array_equal(batch["strain"], i)
+            np.testing.assert_array_equal(batch["labels"], np.arange(4) + 4 * i)
+            time.sleep(0.02)  # a slow consumer: the workers must not run ahead
+            assert len(os.listdir(tmp_path)) <= i + 1 + 4
+    assert i == 11
+    assert pipeline.stats.n_batches == 12 and pipeline.stats.n_items == 48
+    assert pipeline.stats.consume_seconds >= 12 * 0.02
+    assert not any(worker.is_alive() for worker in pipeline.workers)
+
+
+def test_early_exit_and_producer_errors_shut_down():
+    # unlimited batches
+    pipeline = AsyncPipeline(partial(_produce, delay=0.01), n_workers=2, layout=LAYOUT)
+    for i, _ in enumerate(pipeline):
+        if i == 5:
+            break
+    pipeline.close()
+    assert not any(worker.is_alive() for worker in pipeline.workers)
+
+    with pytest.raises(RuntimeError, match="bad batch 3"):
+        with AsyncPipeline(
+            partial(_produce, fail_on=3), n_batches=6, n_workers=2, layout=LAYOUT
+        ) as pipeline:
+            for _ in pipeline:
+                pass
+    assert not any(worker.is_alive() for worker in pipeline.workers)
+
+
+def test_training_batches_match_generate_training_set():
+    # noise and glitches only: signals need the starccato weights
+    producer = TrainingBatchProducer(
+        seed=4, batch_size=3, label_probabilities=(0.5, 0.5, 0.0)
+    )
+    with AsyncPipeline(producer, n_batches=2, n_workers=2, copy=True) as pipeline:
+        batches = list(pipeline)
+    strain, labels, params = generate_training_set(
+        6, seed=4, label_probabilities=(0.5, 0.5, 0.0)
+    )
+    np.testing.assert_array_equal(
+        np.concatenate([b["strain"] for b in batches]), strain
+    )
+    np.testing.assert_array_equal(
+        np.concatenate([b["labels"] for b in batches]), labels
+    )
+    np.testing.assert_array_equal(
+        np.concatenate([b["params"] for b in batches]), params
+    )
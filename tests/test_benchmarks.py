@@ -0,0 +1,50 @@
+import copy
+import json
+
+from burst_search_pipeline.benchmarks import (
+    STAGES,
+    compare_to_baseline,
+    main,
+    run_benchmarks,
+)
+
+
+def test_benchmark_report_and_regression_check(tmp_path):
+    assert {
+        "waveform",
+        "load_interferometers",
+        "compute_snr",
+        "gwpy_qtransform",
+        "model_predict",
+    } <= set(STAGES)
+
+    report = run_benchmarks(
+        ["noise_batch", "model_predict"], batch_sizes=[1, 4], repeats=1
+    )
+    assert [(r["stage"], r["batch_size"]) for r in report["results"]] == [
+        ("noise_batch", 1),
+        ("noise_batch", 4),
+        ("model_predict", 1),
+        ("model_predict", 4),
+    ]
+    assert all(r["status"] == "ok" and r["seconds"] > 0 for r in report["results"])
+    assert report["environment"]["versions"]["numpy"]
+    assert compare_to_baseline(report, report) == []
+
+    faster = copy.deepcopy(report)
+    faster["results"][0]["seconds_per_item"] /= 10
+    assert [r["stage"] for r in compare_to_baseline(report, faster)] == ["noise_batch"]
+
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(faster))
+    args = ["--stages", "noise_batch", "--batch-sizes", "1", "--repeats", "1"]
+    assert (
+        main(
+            args + ["--output", str(tmp_path / "out.json"), "--baseline", str(baseline)]
+        )
+        == 1
+    )
+    assert (
+        json.loads((tmp_path / "out.json").read_text())["results"][0]["stage"]
+        == "noise_batch"
+    )
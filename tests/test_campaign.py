@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from burst_search_pipeline import instrumentation
+from burst_search_pipeline.campaign import (
+    InjectionCampaign,
+    InjectionDistribution,
+    _detectors,
+    _run_batch,
+)
+from burst_search_pipeline.lvk_interferometers import IFO_NAMES
+from burst_search_pipeline.search.model import Model
+from burst_search_pipeline.snr import compute_snr
+from burst_search_pipeline.training_data import sample_rng
+from burst_search_pipeline.waveform_generator import (
+    N_TIMESTAMPS,
+    SAMPLING_FREQ,
+    WaveformBatch,
+    _distance_scaling,
+    generate_waveforms,
+)
+
+
+def sine_gaussian_waveforms(seeds, luminosity_distances):
+    """Stand-in for the starccato generator: 300 Hz sine-Gaussians, phase set by seed"""
+    t = np.arange(N_TIMESTAMPS) / SAMPLING_FREQ - N_TIMESTAMPS / SAMPLING_FREQ / 2
+    phase = np.asarray(seeds)[:, None] % 7
+    strain = np.sin(2 * np.pi * 300 * t + phase) * np.exp(-((t / 0.005) ** 2)) * 0.2
+    strain = _distance_scaling(np.asarray(luminosity_distances))[:, None] * strain
+    return WaveformBatch(
+        strain,
+        np.fft.rfft(strain, axis=-1) / SAMPLING_FREQ,
+        t,
+        np.fft.rfftfreq(N_TIMESTAMPS, 1 / SAMPLING_FREQ),
+    )
+
+
+def _campaign(path, **kwargs):
+    kwargs.setdefault("waveforms", sine_gaussian_waveforms)
+    return InjectionCampaign(
+        str(path),
+        n_injections=300,
+        distribution=InjectionDistribution(distance_range=(0.1, 10), n_seeds=50),
+        batch_size=64,
+        **kwargs,
+    )
+
+
+def test_campaign_resumes_and_is_worker_independent(tmp_path):
+    campaign = _campaign(tmp_path / "a")
+    assert campaign.n_batches == 5
+    for batch in range(2):  # an interrupted run
+        campaign._save(batch, _run_batch(campaign, batch))
+    assert campaign.completed_batches() == [0, 1] and len(campaign.results()) == 128
+    resumed = campaign.run()
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        fresh = _campaign(tmp_path / "b").run(n_workers=2)
+    finally:
+        instrumentation.disable()
+    # the batches ran in worker processes
+    assert instrumentation.summary()["campaign._run_batch"]["calls"] == 5
+    instrumentation.reset()
+    assert len(resumed) == 300
+    for name in ("luminosity_distance", "seed", "optimal_snr", "matched_filter_snr"):
+        np.testing.assert_array_equal(getattr(resumed, name), getattr(fresh, name))
+
+    with pytest.raises(ValueError):
+        InjectionCampaign(str(tmp_path / "a"), n_injections=300, seed=1)
+
+    centres, efficiency, error = resumed.efficiency(np.linspace(0.1, 10, 5))
+    np.testing.assert_allclose(centres, [1.3375, 3.8125, 6.2875, 8.7625])
+    assert (
+        efficiency[0] > 0.9
+        and np.all(np.diff(efficiency) <= 0)
+        and efficiency[-1] < 0.5
+    )
+    assert np.all(np.isfinite(error))
+
+
+def test_campaign_snr_matches_compute_snr(tmp_path):
+    campaign = InjectionCampaign(
+        str(tmp_path), n_injections=3, batch_size=3, waveforms=sine_gaussian_waveforms
+    )
+    result = _run_batch(campaign, 0)
+    source, projector = _detectors(campaign.ifo_names)
+
+    rng = sample_rng(campaign.seed, 0)
+    params = campaign.distribution.sample(3, rng)
+    hp = sine_gaussian_waveforms(
+        params["seed"], params["luminosity_distance"]
+    ).frequency_domain_strain
+    signal = projector.project(
+        hp, hp, params["ra"], params["dec"], params["psi"], params["geocent_time"]
+    )
+    data = source.draw(3, rng) + signal
+    for i in range(3):
+        dh, hh = 0, 0
+        for j in range(source.n_ifos):
+            mf, opt = compute_snr(
+                signal[i, j],
+                data[i, j],
+                source.frequency_array,
+                source.power_spectral_density[j],
+                source.frequency_mask[j],
+            )
+            dh, hh = dh + mf * opt, hh + opt**2
+        np.testing.assert_allclose(result.optimal_snr[i], np.sqrt(hh), rtol=1e-10)
+        np.testing.assert_allclose(
+            result.matched_filter_snr[i], dh / np.sqrt(hh), rtol=1e-10
+        )
+
+
+def test_campaign_records_model_and_waveforms(tmp_path):
+    rng = np.random.default_rng(0)
+    noise = rng.normal(size=(1000, N_TIMESTAMPS, len(IFO_NAMES)))
+    model = Model().fit(noise)
+    _campaign(tmp_path, model=model)
+    _campaign(tmp_path, model=model)
+    with pytest.raises(ValueError):
+        _campaign(tmp_path, model=Model().fit(noise[:500]))
+    with pytest.raises(ValueError):
+        _campaign(tmp_path)
+    with pytest.raises(ValueError):
+        _campaign(tmp_path, model=model, waveforms=generate_waveforms)
+
+    short = _campaign(tmp_path / "short", model=Model().fit(noise[:, :200]))
+    with pytest.raises(ValueError, match="200-sample"):
+        _run_batch(short, 0)
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+
+from burst_search_pipeline.challenge_data import ChallengeDataset, open_block_array
+from burst_search_pipeline.training_data import BurstType
+
+
+def _blocks(n, start):
+    return (start + np.arange(n))[:, None, None] * np.ones((n, 200, 2))
+
+
+def test_open_block_array(tmp_path):
+    blocks = _blocks(5, 0)
+    np.savez(tmp_path / "stored.npz", data=blocks)
+    np.savez_compressed(tmp_path / "compressed.npz", data=blocks)
+    np.save(tmp_path / "plain.npy", blocks)
+    for name in ["stored.npz", "compressed.npz", "plain.npy"]:
+        array = open_block_array(str(tmp_path / name))
+        assert isinstance(array, np.memmap)
+        np.testing.assert_array_equal(array, blocks)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_challenge_dataset(tmp_path):
+    np.savez_compressed(tmp_path / "background.npz", data=_blocks(6, 0))
+    np.save(tmp_path / "bbh_for_challenge.npy", _blocks(4, 100))
+    dataset = ChallengeDataset(str(tmp_path))
+    assert len(dataset) == 10
+    assert (
+        list(dataset.labels)
+        == [BurstType.NOISE.value] * 6 + [BurstType.SIGNAL.value] * 4
+    )
+
+    blocks, labels = dataset.read([7, 0])
+    np.testing.assert_array_equal(blocks[:, 0, 0], [101, 0])
+    np.testing.assert_array_equal(
+        labels, [BurstType.SIGNAL.value, BurstType.NOISE.value]
+    )
+
+    h1 = np.concatenate(list(dataset.iter_blocks("H1", batch_size=4)))
+    assert h1.shape == (10, 200)
+    batches = list(dataset.iter_minibatches(3, rng=np.random.default_rng(0)))
+    assert sorted(np.concatenate([b[:, 0, 0] for b, _ in batches])) == list(
+        range(6)
+    ) + list(range(100, 104))
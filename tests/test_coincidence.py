@@ -0,0 +1,54 @@
+import numpy as np
+
+from burst_search_pipeline.coincidence import (
+    TriggerArrays,
+    coincidence_window,
+    find_coincidences,
+    light_travel_time,
+    time_slides,
+)
+from burst_search_pipeline.streaming import Trigger
+
+
+def _random_triggers(rng, n, livetime):
+    return TriggerArrays(rng.uniform(0, livetime, n), rng.rayleigh(3, n), 0)
+
+
+def test_zero_lag_coincidences():
+    assert 0.0099 < light_travel_time() < 0.0101
+    window = coincidence_window()
+    triggers = [
+        Trigger(10.0, 8, 0),
+        Trigger(10.012, 6, 1),
+        Trigger(20.0, 9, 0),
+        Trigger(20.5, 9, 1),
+    ]
+    h1, l1 = TriggerArrays.from_triggers(triggers, 0), TriggerArrays.from_triggers(
+        triggers, 1
+    )
+    coinc = find_coincidences(h1, l1, window)
+    assert len(coinc) == 1
+    assert h1.time[coinc.index_a[0]] == 10.0 and l1.time[coinc.index_b[0]] == 10.012
+    np.testing.assert_allclose(coinc.statistic, 10)
+
+
+def test_time_slides_match_brute_force():
+    rng = np.random.default_rng(0)
+    livetime, window, step = 100.0, 0.02, 0.3
+    h1, l1 = _random_triggers(rng, 200, livetime), _random_triggers(rng, 200, livetime)
+    background = time_slides(h1, l1, window, step, livetime)
+    assert background.n_slides == 333
+
+    expected = set()
+    for k in range(1, background.n_slides + 1):
+        shifted = np.mod(l1.time + k * step, livetime)
+        dt = np.abs(h1.time[:, None] - shifted[None])
+        dt = np.minimum(dt, livetime - dt)
+        expected.update((i, j, k) for i, j in zip(*np.nonzero(dt <= window)))
+    c = background.coincidences
+    assert set(zip(c.index_a, c.index_b, c.slide)) == expected
+
+    assert background.counts().sum() == len(expected)
+    assert background.false_alarm_rate(0) == len(expected) / (333 * livetime)
+    assert background.false_alarm_rate(np.inf) == 0
+    np.testing.assert_array_less(0, background.loudest()[background.counts() > 0])
@@ -0,0 +1,44 @@
+import numpy as np
+
+from burst_search_pipeline.features import FeatureExtractor
+
+
+def test_feature_extractor():
+    rng = np.random.default_rng(0)
+    background = rng.normal(size=(2000, 200, 2))
+    extractor = FeatureExtractor().fit(background)
+    features = extractor.transform(background)
+    assert features.dtype == np.float32
+    assert (
+        features.shape
+        == (2000, len(extractor.feature_names))
+        == (2000, 2 * (16 + 1 + 5 * 8) + 2)
+    )
+    assert np.all(np.isfinite(features))
+
+    # the same burst in both detectors, L1 delayed by 7 samples
+    t = np.arange(200) / 4096
+    burst = 10 * np.sin(2 * np.pi * 400 * t) * np.exp(-(((t - 0.02) / 0.003) ** 2))
+    blocks = rng.normal(size=(10, 200, 2))
+    blocks[:, :, 0] += burst
+    blocks[:, :, 1] += np.roll(burst, 7)
+    loud = extractor.transform(blocks)
+    names = extractor.feature_names
+    assert np.all(loud[:, names.index("cross_correlation")] > 0.5)
+    assert np.all(np.abs(loud[:, names.index("cross_correlation_lag")]) == 7)
+    assert np.all(
+        loud[:, names.index("ch0_power")] > features[:, names.index("ch0_power")].max()
+    )
+
+    # burst energy (400 Hz, band 1 of the 64 Hz STFT bins) peaks in the frames
+    # covering t = 0.02 s ~ sample 82, i.e. frames 1 (samples 32-95) and 2 (64-127)
+    frame_energy = loud[:, [names.index(f"ch0_frame{f}_band1") for f in range(5)]]
+    assert np.all(np.isin(frame_energy.argmax(axis=1), [1, 2]))
+    assert np.all(
+        frame_energy[:, [0, 4]].max(axis=1) < frame_energy[:, [1, 2]].max(axis=1) - 2
+    )
+
+    no_stft = FeatureExtractor(stft_length=None, whitener=extractor.whitener).transform(
+        blocks
+    )
+    assert no_stft.shape == (10, 2 * 17 + 2)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from burst_search_pipeline.glitch import (
+    GLITCH_FAMILIES,
+    generate_glitches,
+    inject_glitches,
+)
+from burst_search_pipeline.lvk_interferometers import NoiseSource
+
+
+def test_glitch_population():
+    source = NoiseSource()
+    glitches = generate_glitches(
+        400, np.random.default_rng(0), psd=source.power_spectral_density[0]
+    )
+    assert glitches.time_domain_strain.shape == (400, 256)
+    assert glitches.frequency_domain_strain.shape == (400, 129)
+    assert set(glitches.family) == set(range(len(GLITCH_FAMILIES)))
+    assert np.all(np.isfinite(glitches.time_domain_strain))
+
+    # scaled to their optimal SNR
+    psd = source.power_spectral_density[0]
+    valid = np.isfinite(psd) & (psd > 0)
+    power = np.abs(glitches.frequency_domain_strain[:, valid]) ** 2 / psd[valid]
+    np.testing.assert_allclose(np.sqrt(4 * 16 * power.sum(axis=1)), glitches.snr)
+
+    noise = source.draw(400, np.random.default_rng(1))
+    ifo_index = np.random.default_rng(2).integers(2, size=400)
+    injected = inject_glitches(noise, glitches, ifo_index)
+    rows = np.arange(400)
+    np.testing.assert_allclose(
+        injected[rows, ifo_index] - noise[rows, ifo_index],
+        glitches.frequency_domain_strain,
+        atol=1e-9 * np.abs(noise).max(),
+    )
+    np.testing.assert_array_equal(
+        injected[rows, 1 - ifo_index], noise[rows, 1 - ifo_index]
+    )
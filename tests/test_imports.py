@@ -0,0 +1,49 @@
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = (
+    "bilby",
+    "torch",
+    "starccato",
+    "matplotlib",
+    "gwpy",
+    "pycbc",
+    "scipy.signal",
+)
+
+
+def _run(code):
+    return subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+
+def test_core_modules_import_without_heavy_dependencies():
+    loaded = json.loads(
+        _run(
+            "import json, sys\n"
+            "import burst_search_pipeline.training_data\n"
+            "import burst_search_pipeline.streaming\n"
+            "import burst_search_pipeline.snr, burst_search_pipeline.coincidence\n"
+            "import burst_search_pipeline.projection\n"
+            "import burst_search_pipeline.search.model\n"
+            "import burst_search_pipeline.challenge_data\n"
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+        )
+    )
+    assert loaded == []
+
+
+def test_generators_are_built_on_first_use():
+    out = _run(
+        "import sys, logging\n"
+        "from burst_search_pipeline.glitch import GLITCH_GENERATOR\n"
+        "from burst_search_pipeline import waveform_generator\n"
+        "record = logging.makeLogRecord({'levelno': 20})\n"
+        "print('bilby' in sys.modules, not logging.getLogger('bilby').filter(record))\n"
+        "generator = waveform_generator.WAVEFORM_GENERATOR\n"
+        "print(GLITCH_GENERATOR.duration == generator.duration)\n"
+        "print(generator is waveform_generator.WAVEFORM_GENERATOR)\n"
+    )
+    assert out.split() == ["True", "True", "True", "True"]
@@ -0,0 +1,69 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from burst_search_pipeline import instrumentation
+from burst_search_pipeline.instrumentation import instrument, pool_map, stage
+from burst_search_pipeline.snr import compute_snr
+from burst_search_pipeline.training_data import generate_training_set
+
+
+@instrument("test.double")
+def _double(x):
+    return 2 * x
+
+
+def test_instrumentation_records_stages(tmp_path):
+    instrumentation.reset()
+    _double(np.ones(10))
+    with stage("test.block") as timer:
+        assert timer is None
+    assert instrumentation.summary() == {}
+
+    instrumentation.enable()
+    try:
+        for _ in range(3):
+            _double(np.ones(10))
+        with stage("test.block") as timer:
+            timer.add_bytes((np.ones(4), np.ones(2, dtype=np.float32)))
+        freq = np.linspace(0, 100, 11)
+        compute_snr(
+            np.ones(11), np.ones(11), freq, np.ones(11), np.ones(11, dtype=bool)
+        )
+    finally:
+        instrumentation.disable()
+
+    summary = instrumentation.summary()
+    assert summary["test.double"]["calls"] == 3
+    assert summary["test.double"]["output_bytes"] == 3 * 80
+    assert summary["test.block"]["output_bytes"] == 40
+    assert summary["snr.compute_snr"]["calls"] == 1
+    assert all(s["wall_time"] >= 0 and s["cpu_time"] >= 0 for s in summary.values())
+
+    instrumentation.dump(tmp_path / "stages.json")
+    assert json.loads((tmp_path / "stages.json").read_text()) == summary
+    instrumentation.REGISTRY.merge(summary)
+    assert instrumentation.summary()["test.double"]["calls"] == 6
+    instrumentation.reset()
+
+
+def test_pool_map_merges_worker_stages():
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            doubled = list(pool_map(pool, _double, [np.ones(3)] * 4))
+        # glitches only; signals would need the starccato weights
+        generate_training_set(
+            6, n_workers=2, label_probabilities=(0.0, 1.0, 0.0), chunk_size=3
+        )
+    finally:
+        instrumentation.disable()
+
+    summary = instrumentation.summary()
+    np.testing.assert_array_equal(doubled, 2 * np.ones((4, 3)))
+    assert summary["test.double"]["calls"] == 4
+    assert summary["test.double"]["output_bytes"] == 4 * 24
+    assert summary["glitch.generate_glitches"]["calls"] == 6
+    instrumentation.reset()
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from burst_search_pipeline.search.model import Model
+from burst_search_pipeline.training_data import BurstType
+
+
+def test_model_scores_bursts_above_background():
+    rng = np.random.default_rng(0)
+    background = rng.normal(size=(5000, 200, 2))
+    labels = np.full(len(background), BurstType.NOISE.value)
+    labels[:10] = BurstType.SIGNAL.value  # ignored when fitting
+    model = Model(batch_size=512).fit(background, labels)
+
+    blocks = rng.normal(size=(2000, 200, 2))
+    t = np.arange(200) / 4096
+    burst = 3 * np.sin(2 * np.pi * 300 * t) * np.exp(-(((t - 0.025) / 0.005) ** 2))
+    blocks[:20] += burst[None, :, None]
+
+    probability = model.predict(blocks)
+    assert probability.shape == (2000,)
+    assert probability[:20].mean() > 0.95
+    assert 0.4 < probability[20:].mean() < 0.6
+    assert model.stats.n_blocks == 2000 and model.stats.n_batches == 4
+    assert model.stats.throughput > 0
+
+
+def test_model_fits_in_batches():
+    rng = np.random.default_rng(1)
+    background = rng.normal(size=(3000, 200, 2))
+    labels = np.full(len(background), BurstType.NOISE.value)
+    labels[::10] = BurstType.GLITCH.value
+
+    model = Model(batch_size=1000).fit(background, labels)
+    batches = [
+        (background[i : i + 1000], labels[i : i + 1000]) for i in range(0, 3000, 1000)
+    ]
+    from_batches = Model().fit(batches)
+    np.testing.assert_allclose(from_batches.mean, model.mean)
+    np.testing.assert_allclose(
+        from_batches._background_scores, model._background_scores
+    )
+    assert len(model._background_scores) == 2700
+
+    # one batch: the median PSD of all blocks; with the same PSDs, the same Gaussian
+    whole = Model(batch_size=3000).fit(background, labels)
+    np.testing.assert_allclose(model.whitener.psd, whole.whitener.psd, rtol=0.1)
+    shared = Model(batch_size=1000, whitener=whole.whitener).fit(background, labels)
+    np.testing.assert_allclose(shared.mean, whole.mean, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(
+        shared._whitening, whole._whitening, rtol=1e-4, atol=1e-6
+    )
+    np.testing.assert_allclose(
+        shared._background_scores, whole._background_scores, rtol=1e-4
+    )
+
+    with pytest.raises(ValueError):
+        Model().fit(iter(batches))
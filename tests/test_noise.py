@@ -0,0 +1,35 @@
+import numpy as np
+from bilby.core.utils import random
+from bilby.gw.detector import InterferometerList
+
+from burst_search_pipeline.lvk_interferometers import NoiseSource
+
+
+def test_noise_source_matches_bilby_realisations():
+    random.seed(7)
+    expected = []
+    for _ in range(3):
+        ifos = InterferometerList(["H1", "L1"])
+        ifos.set_strain_data_from_power_spectral_densities(
+            sampling_frequency=4096, duration=256 / 4096
+        )
+        expected.append([ifo.strain_data.frequency_domain_strain for ifo in ifos])
+
+    source = NoiseSource()
+    noise = source.draw(3, np.random.default_rng(7)) * source.frequency_mask
+    np.testing.assert_array_equal(noise, np.array(expected))
+
+
+def test_noise_source_statistics():
+    source = NoiseSource()
+    noise = source.draw(20000, np.random.default_rng(0))
+    assert noise.shape == (20000, 2, 129)
+    # bilby zeroes the noise beyond the PSD files' 2 kHz upper limit
+    mask = source.frequency_mask[0] & (source.frequency_array < 2000)
+    psd_estimate = 2 * np.mean(np.abs(noise) ** 2, axis=0) / source.duration
+    np.testing.assert_allclose(
+        psd_estimate[:, mask], source.power_spectral_density[:, mask], rtol=0.05
+    )
+
+    time_domain = source.time_domain(noise[:2])
+    assert time_domain.shape == (2, 2, 256)
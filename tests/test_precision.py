@@ -0,0 +1,138 @@
+import numpy as np
+import pytest
+
+from burst_search_pipeline import precision
+from burst_search_pipeline.features import FeatureExtractor
+from burst_search_pipeline.lvk_interferometers import NoiseSource
+from burst_search_pipeline.projection import DetectorProjector
+from burst_search_pipeline.qtransform import QTransformEngine
+from burst_search_pipeline.snr import (
+    TemplateBankFilter,
+    batch_inner_product,
+    compute_snr,
+)
+from burst_search_pipeline.training_data import compute_qgrams, generate_training_set
+from burst_search_pipeline.training_store import TrainingStore
+
+SAMPLING_FREQ = 4096
+
+
+def _in_both_precisions(func):
+    with precision.precision("double"):
+        double = func()
+    with precision.precision("single"):
+        single = func()
+    return double, single
+
+
+def _sine_gaussians(n, rng, amplitude=1e-21):
+    t = np.arange(256) / SAMPLING_FREQ
+    f0 = rng.uniform(100, 800, (n, 1))
+    t0 = rng.uniform(0.02, 0.04, (n, 1))
+    return amplitude * np.sin(2 * np.pi * f0 * t) * np.exp(-(((t - t0) / 0.005) ** 2))
+
+
+def test_precision_setting():
+    assert precision.get_precision() == "double"
+    with precision.precision("single"):
+        assert precision.real_dtype() == np.float32
+        assert precision.complex_dtype() == np.complex64
+    assert precision.get_precision() == "double"
+    with pytest.raises(ValueError):
+        precision.set_precision("half")
+
+
+def test_noise_and_projection_single_precision():
+    noise_source = NoiseSource()
+    projector = DetectorProjector(noise_source=noise_source)
+    rng = np.random.default_rng(0)
+    signal = np.fft.rfft(_sine_gaussians(4, rng), axis=-1) / SAMPLING_FREQ
+    ra, dec, psi = (rng.uniform(0, 1, 4) for _ in range(3))
+
+    noise, noise32 = _in_both_precisions(
+        lambda: noise_source.draw(4, np.random.default_rng(1))
+    )
+    assert noise.dtype == np.complex128 and noise32.dtype == np.complex64
+    np.testing.assert_allclose(
+        noise32, noise, rtol=1e-6, atol=1e-6 * np.abs(noise).max()
+    )
+
+    projected, projected32 = _in_both_precisions(
+        lambda: projector.project(
+            signal, signal, ra, dec, psi, geocent_time=1126259642.413
+        )
+    )
+    assert projected32.dtype == np.complex64
+    np.testing.assert_allclose(
+        projected32, projected, rtol=1e-5, atol=1e-5 * np.abs(projected).max()
+    )
+
+
+def test_snr_single_precision_accumulates_in_double():
+    noise_source = NoiseSource()
+    freq = noise_source.frequency_array
+    psd = noise_source.power_spectral_density[0]
+    fmask = noise_source.frequency_mask[0]
+    rng = np.random.default_rng(2)
+    templates = np.fft.rfft(_sine_gaussians(8, rng), axis=-1) / SAMPLING_FREQ
+    data = noise_source.draw(1, rng)[0, 0] + 3 * templates[0]
+    data32, templates32 = data.astype(np.complex64), templates.astype(np.complex64)
+
+    # |h|^2 ~ 1e-50 is below float32's range: these would be zero without
+    # double accumulation
+    mf_snr, o_snr = compute_snr(templates[0], data, freq, psd, fmask)
+    mf_snr32, o_snr32 = compute_snr(templates32[0], data32, freq, psd, fmask)
+    assert o_snr > 1
+    np.testing.assert_allclose([mf_snr32, o_snr32], [mf_snr, o_snr], rtol=1e-5)
+    hh = batch_inner_product(templates, templates, freq, np.where(fmask, psd, np.inf))
+    hh32 = batch_inner_product(
+        templates32, templates32, freq, np.where(fmask, psd, np.inf)
+    )
+    np.testing.assert_allclose(hh32, hh, rtol=1e-5)
+
+    (snr, norms), (snr32, norms32) = _in_both_precisions(
+        lambda: TemplateBankFilter(templates).filter_time_series(
+            data32, freq, psd, fmask
+        )
+    )
+    assert snr32.dtype == np.complex64
+    np.testing.assert_allclose(norms32, norms, rtol=1e-5)
+    np.testing.assert_allclose(snr32, snr, atol=1e-4 * np.abs(snr).max())
+
+
+def test_qgrams_and_features_single_precision():
+    rng = np.random.default_rng(3)
+    strain = _sine_gaussians(6, rng)[:, None, :] + 1e-22 * rng.normal(size=(6, 2, 256))
+
+    qgram, qgram32 = _in_both_precisions(
+        lambda: compute_qgrams(strain, QTransformEngine(n_freqs=32, n_times=32))
+    )
+    assert qgram32.dtype == np.float32
+    np.testing.assert_allclose(qgram32, qgram, rtol=1e-3, atol=1e-4 * qgram.max())
+    assert QTransformEngine(norm=None, dtype=np.float32).dtype == np.float64
+
+    blocks = strain.transpose(0, 2, 1)[:, :200]
+    extractor = FeatureExtractor().fit(blocks)
+    features, features32 = _in_both_precisions(lambda: extractor.transform(blocks))
+    np.testing.assert_allclose(features32, features, atol=1e-3)
+
+
+def test_training_set_single_precision(tmp_path):
+    with precision.precision("single"):
+        strain, labels, _ = generate_training_set(
+            3, seed=0, label_probabilities=(1.0, 0.0, 0.0)
+        )
+        store = TrainingStore(str(tmp_path), strain_shape=strain.shape[1:])
+        with store:
+            store.append(strain, labels)
+    strain64, _, _ = generate_training_set(
+        3, seed=0, label_probabilities=(1.0, 0.0, 0.0)
+    )
+    assert strain.dtype == np.float32
+    np.testing.assert_allclose(
+        strain, strain64, rtol=1e-6, atol=1e-6 * np.abs(strain64).max()
+    )
+    # the store keeps the dtype it was created with
+    reopened = TrainingStore(str(tmp_path))
+    assert reopened.dtype == np.float32
+    assert reopened.read([0, 1])["strain"].dtype == np.float32
@@ -0,0 +1,33 @@
+import numpy as np
+
+from burst_search_pipeline.lvk_interferometers import NoiseSource
+from burst_search_pipeline.projection import DetectorProjector
+
+
+def test_projection_matches_bilby_detector_response():
+    rng = np.random.default_rng(0)
+    n = 5
+    ra, dec, psi = (
+        rng.uniform(0, 2 * np.pi, n),
+        np.arcsin(rng.uniform(-1, 1, n)),
+        rng.uniform(0, np.pi, n),
+    )
+    geocent_time = 1126259642.413 + rng.uniform(0, 1e5, n)
+    source = NoiseSource()
+    plus = rng.normal(size=129) + 1j * rng.normal(size=129)
+    cross = rng.normal(size=129) + 1j * rng.normal(size=129)
+
+    projector = DetectorProjector(noise_source=source)
+    strain = projector.project(
+        plus, cross, ra, dec, psi, geocent_time, start_time=geocent_time - 0.01
+    )
+    assert strain.shape == (n, 2, 129)
+
+    for i in range(n):
+        ifos = source.interferometers_from_noise(
+            np.zeros((2, 129)), start_time=geocent_time[i] - 0.01
+        )
+        params = dict(ra=ra[i], dec=dec[i], psi=psi[i], geocent_time=geocent_time[i])
+        for j, ifo in enumerate(ifos):
+            expected = ifo.get_detector_response(dict(plus=plus, cross=cross), params)
+            np.testing.assert_allclose(strain[i, j], expected, rtol=1e-6, atol=1e-12)
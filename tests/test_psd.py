@@ -0,0 +1,67 @@
+import numpy as np
+from scipy.signal import butter, sosfilt
+
+from burst_search_pipeline.psd import (
+    BlockPSDAccumulator,
+    PSDCache,
+    Whitener,
+    psd_from_blocks,
+)
+from burst_search_pipeline.streaming import design_psd, simulated_noise_chunks
+
+
+def _background(duration):
+    strain = np.concatenate(
+        list(simulated_noise_chunks(duration, rng=np.random.default_rng(0))), axis=-1
+    )
+    return sosfilt(butter(8, 20, "highpass", fs=4096, output="sos"), strain, axis=-1)
+
+
+def test_psd_cache_and_whitening():
+    strain = _background(64)
+    cache = PSDCache()
+    for detector, channel in zip(["H1", "L1"], strain):
+        cache.psd(detector, 0, 64, channel)
+    assert ("H1", 0, 64) in cache
+
+    whitener = cache.whitener(["H1", "L1"], 0, 64, 256)
+    assert whitener is cache.whitener(["H1", "L1"], 0, 64, 256)
+    band = (whitener.frequency_array > 40) & (whitener.frequency_array < 1800)
+    np.testing.assert_allclose(
+        np.median(whitener.psd[:, band] / design_psd()[:, band], axis=1), 1, rtol=0.05
+    )
+
+    segments = strain[:, : 256 * 500].reshape(2, 500, 256).transpose(1, 0, 2)
+    np.testing.assert_allclose(whitener.whiten(segments).std(), 1, rtol=0.05)
+
+    # 200-sample challenge-style blocks, channels last
+    blocks = strain[:, : 200 * 1000].reshape(2, 1000, 200).transpose(1, 2, 0)
+    block_whitener = cache.whitener(["H1", "L1"], 0, 64, 200)
+    assert block_whitener.whiten(blocks, channel_axis=-1).shape == blocks.shape
+    np.testing.assert_allclose(
+        block_whitener.whiten(blocks, channel_axis=-1).std(), 1, rtol=0.05
+    )
+    np.testing.assert_allclose(
+        Whitener(psd_from_blocks(blocks), 200).whiten(blocks, channel_axis=-1).std(),
+        1,
+        rtol=0.05,
+    )
+
+
+def test_block_psd_accumulator():
+    blocks = np.random.default_rng(1).normal(size=(1000, 200, 2))
+    welch = BlockPSDAccumulator(method="welch")
+    median = BlockPSDAccumulator()
+    for start in range(0, 1000, 300):
+        welch.add(blocks[start : start + 300])
+        median.add(blocks[start : start + 300])
+    assert welch.n_blocks == 1000
+    np.testing.assert_allclose(welch.psd(), psd_from_blocks(blocks, method="welch"))
+    np.testing.assert_allclose(median.psd(), psd_from_blocks(blocks), rtol=0.2)
+    np.testing.assert_allclose(
+        median.psd()[:, 1:-1].mean(), psd_from_blocks(blocks)[:, 1:-1].mean(), rtol=0.02
+    )
+    # the DC and Nyquist bins are chi^2_1, not chi^2_2
+    np.testing.assert_allclose(
+        median.psd()[:, [0, -1]], welch.psd()[:, [0, -1]], rtol=0.2
+    )
@@ -0,0 +1,44 @@
+import numpy as np
+
+from burst_search_pipeline.qtransform import QTransformEngine
+from burst_search_pipeline.training_data import (
+    BurstType,
+    TrainingData,
+    write_training_set,
+)
+
+SAMPLING_FREQ = 4096
+
+
+def _sine_gaussian(f0, t0, tau=0.01):
+    t = np.arange(256) / SAMPLING_FREQ
+    return np.sin(2 * np.pi * f0 * t) * np.exp(-(((t - t0) / tau) ** 2))
+
+
+def test_qtransform_engine_localises_bursts():
+    engine = QTransformEngine(n_freqs=128, norm=None)
+    rng = np.random.default_rng(1)
+    bursts = [(256, 0.03), (512, 0.02), (800, 0.04)]
+    strain = np.array([_sine_gaussian(f0, t0) for f0, t0 in bursts]) + 0.1 * rng.normal(
+        size=(3, 256)
+    )
+
+    qgrams = engine.transform(strain)
+    assert qgrams.shape == (3, 128, 64)
+    for qgram, (f0, t0) in zip(qgrams, bursts):
+        fi, ti = np.unravel_index(qgram.argmax(), qgram.shape)
+        assert abs(engine.frequencies[fi] - f0) < 0.05 * f0
+        assert abs(engine.times[ti] - t0) < 0.005
+
+    np.testing.assert_allclose(engine.transform(strain[1]), qgrams[1])
+
+
+def test_training_qgrams(tmp_path):
+    engine = QTransformEngine(n_freqs=16, n_times=16)
+    data = TrainingData(BurstType.NOISE).generate(seed=0).compute_qgram(engine)
+    assert data.qgram.shape == (2, 16, 16)
+
+    store = write_training_set(
+        str(tmp_path), 3, label_probabilities=(1.0, 0.0, 0.0), qgram_engine=engine
+    )
+    assert store.read([0, 2], fields=("qgram",))["qgram"].shape == (2, 2, 16, 16)
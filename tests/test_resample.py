@@ -0,0 +1,48 @@
+import numpy as np
+from scipy.signal import resample_poly
+
+from burst_search_pipeline.qtransform import QTransformEngine
+from burst_search_pipeline.resample import Resampler, StreamingResampler
+from burst_search_pipeline.training_data import compute_qgrams
+
+
+def test_resampler_matches_resample_poly_and_streams():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(3, 2, 1000))
+    for output_rate in (8192, 2048, 3000):
+        resampler = Resampler(4096, output_rate)
+        y = resampler.resample(x)
+        assert y.shape[-1] == resampler.output_length(1000)
+        expected = resample_poly(
+            x,
+            resampler.up,
+            resampler.down,
+            axis=-1,
+            window=resampler.taps / resampler.up,
+        )
+        np.testing.assert_allclose(y, expected, atol=1e-12)
+
+        sizes = np.cumsum(rng.integers(1, 150, 30))
+        chunks = np.split(x, sizes[sizes < 1000], axis=-1)
+        streamed = np.concatenate(
+            list(StreamingResampler(resampler).stream(chunks)), axis=-1
+        )
+        np.testing.assert_allclose(streamed, y, atol=1e-12)
+
+
+def test_upsampled_sinusoid_and_qgrams():
+    t = np.arange(256) / 4096
+    resampler = Resampler(4096, 8192)
+    y = resampler.resample(np.sin(2 * np.pi * 200 * t))
+    t_up = np.arange(512) / 8192
+    # away from the zero-padded edges, the band-limited interpolation is exact
+    # to the filter's ripple
+    np.testing.assert_allclose(
+        y[64:-64], np.sin(2 * np.pi * 200 * t_up)[64:-64], atol=2e-3
+    )
+
+    engine = QTransformEngine(sampling_frequency=8192, n_samples=512, norm=None)
+    qgrams = compute_qgrams(
+        np.random.default_rng(1).normal(size=(4, 2, 256)), engine, resampler
+    )
+    assert qgrams.shape == (4, 2) + engine.shape
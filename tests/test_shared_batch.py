@@ -0,0 +1,91 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from burst_search_pipeline.shared_batch import BatchLayout, SharedBatchPool
+
+LAYOUT = BatchLayout(
+    8,
+    dict(
+        strain=((2, 256), np.float32),
+        frequency_domain_strain=((2, 129), np.complex64),
+        labels=((), np.int64),
+    ),
+)
+
+
+def _fill(handle, slot, value):
+    pool = SharedBatchPool.attach(handle)
+    views = pool.views(slot)
+    views["strain"][...] = value
+    views["frequency_domain_strain"][...] = value * 1j
+    views["labels"][...] = np.arange(8) + value
+    pool.close()
+
+
+def test_layout():
+    assert LAYOUT.nbytes % 64 == 0
+    assert LAYOUT.nbytes >= 8 * (2 * 256 * 4 + 2 * 129 * 8 + 8)
+    example = dict(
+        strain=np.zeros((3, 2, 256), np.float32),
+        labels=np.zeros(3, np.int64),
+        frequency_domain_strain=np.zeros((3, 2, 129), np.complex64),
+    )
+    assert BatchLayout.from_batch(example, batch_size=8) == LAYOUT
+
+
+def test_workers_fill_slots_without_copies():
+    with SharedBatchPool(LAYOUT, n_slots=3) as pool:
+        slots = [pool.acquire() for _ in range(3)]
+        assert pool.acquire() is None
+        processes = [
+            multiprocessing.Process(target=_fill, args=(pool.handle, slot, slot + 1))
+            for slot in slots
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0
+
+        for slot in slots:
+            views = pool.views(slot)
+            assert (
+                views["strain"].shape == (8, 2, 256)
+                and views["strain"].dtype == np.float32
+            )
+            np.testing.assert_array_equal(views["strain"], slot + 1)
+            np.testing.assert_array_equal(
+                views["frequency_domain_strain"], (slot + 1) * 1j
+            )
+            np.testing.assert_array_equal(views["labels"], np.arange(8) + slot + 1)
+        # views of a slot are the slot's memory, not copies
+        assert np.shares_memory(
+            pool.views(slots[0])["strain"], pool.views(slots[0], 2)["strain"]
+        )
+        assert not np.shares_memory(
+            pool.views(slots[0])["strain"], pool.views(slots[1])["strain"]
+        )
+
+        pool.release(slots[1])
+        assert pool.acquire() == slots[1]
+        with pytest.raises(ValueError):
+            pool.release(7)
+
+
+def test_write_and_close_with_live_views():
+    pool = SharedBatchPool(LAYOUT, n_slots=1)
+    batch = dict(
+        strain=np.ones((5, 2, 256)),
+        labels=np.arange(5),
+        frequency_domain_strain=np.zeros((5, 2, 129), np.complex128),
+    )
+    assert pool.write(0, batch) == 5
+    views = pool.views(0, 5)
+    with pytest.raises(ValueError):
+        pool.write(0, dict(strain=batch["strain"]))
+    pool.close()
+    # the mapping outlives the pool while views reference it
+    np.testing.assert_array_equal(views["labels"], np.arange(5))
+    assert views["strain"].sum() == 5 * 2 * 256
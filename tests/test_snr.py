@@ -0,0 +1,56 @@
+import numpy as np
+
+from burst_search_pipeline.lvk_interferometers import load_interferometers
+from burst_search_pipeline.snr import TemplateBankFilter, compute_snr, find_snr_peaks
+
+
+def _random_templates(n, n_freq, seed=0):
+    rng = np.random.default_rng(seed)
+    return 1e-23 * (rng.normal(size=(n, n_freq)) + 1j * rng.normal(size=(n, n_freq)))
+
+
+def test_template_bank_matches_compute_snr():
+    ifos = load_interferometers()
+    ifo = ifos[0]
+    kwgs = dict(
+        data=ifo.strain_data.frequency_domain_strain,
+        freq=ifo.strain_data.frequency_array,
+        psd=ifo.power_spectral_density_array,
+        fmask=ifo.strain_data.frequency_mask,
+    )
+    templates = _random_templates(10, len(ifo.strain_data.frequency_array))
+
+    bank = TemplateBankFilter(templates, chunk_size=3)
+    mf_snr, o_snr = bank.filter(**kwgs)
+
+    for i, h in enumerate(templates):
+        expected_mf, expected_o = compute_snr(signal=h, **kwgs)
+        np.testing.assert_allclose(mf_snr[i], expected_mf, rtol=1e-10)
+        np.testing.assert_allclose(o_snr[i], expected_o, rtol=1e-10)
+
+    result = bank.filter_interferometers(ifos)
+    assert result.matched_filter_snr.shape == (2, 10)
+    assert result.detectors == ["H1", "L1"]
+    # H1 and L1 share the design-curve PSD, so the template norms are reused
+    assert len(bank._norm_cache) == 1
+
+
+def test_snr_time_series_recovers_shift():
+    ifo = load_interferometers()[0]
+    freq = ifo.strain_data.frequency_array
+    psd = ifo.power_spectral_density_array
+    fmask = ifo.strain_data.frequency_mask
+    template = _random_templates(1, len(freq), seed=1)[0]
+    true_shift = 40 / ifo.strain_data.sampling_frequency
+    data = 100 * template * np.exp(-2j * np.pi * freq * true_shift)
+
+    bank = TemplateBankFilter(template[None, :])
+    snr, o_snr = bank.filter_time_series(data, freq, psd, fmask)
+    mf_snr, _ = bank.filter(data, freq, psd, fmask)
+    np.testing.assert_allclose(snr[0, 0].real, mf_snr[0])
+
+    template_idx, shift_idx, peak = find_snr_peaks(
+        snr, threshold=0.9 * np.abs(snr).max()
+    )
+    assert list(shift_idx) == [40]
+    np.testing.assert_allclose(peak[0], 100 * o_snr[0], rtol=1e-6)
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from burst_search_pipeline.search.model import Model
+from burst_search_pipeline.snr import TemplateBankFilter
+from burst_search_pipeline.streaming import (
+    SegmentStream,
+    StreamingSearch,
+    array_chunks,
+    design_psd,
+    matched_filter_stage,
+    model_stage,
+    simulated_noise_chunks,
+)
+
+SAMPLING_FREQ = 4096
+
+
+def test_segments_independent_of_chunking():
+    strain = np.random.default_rng(0).normal(size=(2, 5000))
+    stream = SegmentStream(psd=np.ones((2, 129)), stride=100)
+    whole = [
+        b.strain.copy() for b in stream.segments(array_chunks(strain, chunk_size=5000))
+    ]
+    chunked = [
+        b.strain.copy() for b in stream.segments(array_chunks(strain, chunk_size=333))
+    ]
+    np.testing.assert_array_equal(np.concatenate(whole), np.concatenate(chunked))
+    assert len(np.concatenate(whole)) == 50
+
+
+def test_every_sample_owned_by_one_segment():
+    for n_samples, stride in [(5000, 100), (1000, 128), (100, 128), (1024, 256)]:
+        strain = np.arange(1, n_samples + 1, dtype=float)[None]
+        stream = SegmentStream(
+            psd=np.ones((1, 129)), stride=stride, window=np.ones(256), highpass=None
+        )
+        owned = []
+        for batch in stream.segments(array_chunks(strain, chunk_size=333)):
+            first, last = (np.round(np.array(batch.valid) * SAMPLING_FREQ)).astype(int)
+            for start, segment in zip(batch.start_times, batch.strain[:, 0]):
+                offsets = np.arange(first, last)
+                keep = (start + offsets / SAMPLING_FREQ) < batch.end_time
+                owned.append(segment[offsets[keep]])
+        np.testing.assert_array_equal(np.concatenate(owned), strain[0])
+
+
+def test_streaming_matched_filter_finds_injection():
+    psd = design_psd(("H1",))
+    noise = next(
+        simulated_noise_chunks(
+            4.0,
+            ifo_names=("H1",),
+            chunk_size=4 * SAMPLING_FREQ,
+            rng=np.random.default_rng(1),
+        )
+    )
+
+    t = np.arange(64) / SAMPLING_FREQ
+    pulse = np.sin(2 * np.pi * 300 * t) * np.hanning(64)
+    template = np.fft.rfft(pulse, n=256) / SAMPLING_FREQ
+    injection_sample = 3 * SAMPLING_FREQ + 100
+    noise[0, injection_sample : injection_sample + 64] += 2e-21 * pulse
+
+    freq = np.fft.rfftfreq(256, 1 / SAMPLING_FREQ)
+    fmask = (freq > 20) & (freq < 2000)
+    stage = matched_filter_stage(
+        TemplateBankFilter(template[None]), psd[0], fmask, threshold=8
+    )
+    search = StreamingSearch(SegmentStream(psd), [stage])
+    triggers = list(search.run(array_chunks(noise, chunk_size=SAMPLING_FREQ)))
+
+    assert search.n_segments == 4 * SAMPLING_FREQ // 128
+    loudest = max(triggers, key=lambda trig: trig.statistic)
+    assert abs(loudest.time - injection_sample / SAMPLING_FREQ) < 2 / SAMPLING_FREQ
+
+
+def test_whitened_noise_has_unit_variance():
+    stream = SegmentStream(design_psd(), window=np.ones(256))
+    chunks = simulated_noise_chunks(8.0, rng=np.random.default_rng(0))
+    whitened = np.concatenate(
+        [b.whitened_strain.copy() for b in stream.segments(chunks)]
+    )
+    np.testing.assert_allclose(whitened[:, :, 64:192].std(axis=(0, 2)), 1, rtol=0.05)
+
+
+def test_streaming_model_stage():
+    stream = SegmentStream(design_psd())
+    background = simulated_noise_chunks(128.0, rng=np.random.default_rng(2))
+    segments = [b.strain.transpose(0, 2, 1).copy() for b in stream.segments(background)]
+    model = Model().fit(np.concatenate(segments))
+
+    noise = next(
+        simulated_noise_chunks(
+            8.0, chunk_size=8 * SAMPLING_FREQ, rng=np.random.default_rng(3)
+        )
+    )
+    t = np.arange(64) / SAMPLING_FREQ
+    injection_sample = 5 * SAMPLING_FREQ
+    noise[:, injection_sample : injection_sample + 64] += (
+        2e-20 * np.sin(2 * np.pi * 300 * t) * np.hanning(64)
+    )
+    search = StreamingSearch(stream, [model_stage(model, threshold=0.99)])
+    triggers = list(search.run(array_chunks(noise, chunk_size=SAMPLING_FREQ)))
+
+    # away from the zero-padded edges, noise triggers at about the 1% false-alarm
+    # rate, plus the injection
+    inside = [t for t in triggers if 0.1 < t.time < 7.9]
+    assert len(inside) < 0.05 * search.n_segments
+    assert any(abs(t.time - injection_sample / SAMPLING_FREQ) < 0.05 for t in triggers)
+
+    short = Model().fit(np.concatenate(segments)[:, :200])
+    with pytest.raises(ValueError, match="200-sample"):
+        list(StreamingSearch(stream, [model_stage(short, 0.99)]).run([noise]))
@@ -0,0 +1,74 @@
+import numpy as np
+
+from burst_search_pipeline.lvk_interferometers import NoiseSource
+from burst_search_pipeline.template_bank import (
+    HierarchicalTemplateBank,
+    _matches,
+    _whitened_unit_templates,
+    overlap_matrix,
+    place_templates,
+)
+
+
+def _sine_gaussians(rng, n):
+    f0, q = rng.uniform(60, 900, n), rng.uniform(3, 20, n)
+    t = (np.arange(256) - 128) / 4096
+    tau = q / (np.sqrt(2) * np.pi * f0)
+    strain = (
+        np.sin(2 * np.pi * f0[:, None] * t) * np.exp(-((t / tau[:, None]) ** 2)) * 1e-21
+    )
+    return np.fft.rfft(strain, axis=-1) / 4096
+
+
+def test_bank_placement_and_hierarchical_search():
+    rng = np.random.default_rng(0)
+    source = NoiseSource()
+    grid = (
+        source.frequency_array,
+        source.power_spectral_density[0],
+        source.frequency_mask[0],
+    )
+    candidates = _sine_gaussians(rng, 300)
+
+    bank = HierarchicalTemplateBank.build(
+        candidates, *grid, minimal_match=0.97, coarse_match=0.8
+    )
+    kept = place_templates(candidates, *grid, minimal_match=0.97)
+    np.testing.assert_array_equal(bank.templates, candidates[kept])
+    assert len(bank.centroids) < len(bank) < len(candidates) / 2
+
+    matches = overlap_matrix(candidates, *grid)
+    np.testing.assert_allclose(np.diag(matches), 1)
+    assert matches[:, kept].max(axis=1).min() >= 0.97
+    to_centroid = matches[np.ix_(kept, kept)][
+        np.arange(len(kept)), bank.centroids[bank.assignment]
+    ]
+    assert to_centroid.min() >= 0.8
+
+    n_filtered, ratios = [], []
+    for i in rng.integers(len(candidates), size=20):
+        data = source.draw(1, rng)[0, 0] + 3 * candidates[i]
+        coarse_to_fine = bank.search(data, *grid, threshold=8)
+        exhaustive = bank.search_exhaustive(data, *grid)
+        ratios.append(coarse_to_fine.snr / exhaustive.snr)
+        n_filtered.append(coarse_to_fine.n_filtered)
+    assert min(ratios) > 0.95
+    assert np.mean(n_filtered) < 0.75 * len(bank)
+
+
+def test_matches_chunks_within_max_bytes():
+    source = NoiseSource()
+    unit = _whitened_unit_templates(
+        _sine_gaussians(np.random.default_rng(1), 20),
+        source.frequency_array,
+        source.power_spectral_density[0],
+        source.frequency_mask[0],
+    )
+    row_bytes = 20 * (unit.shape[-1] + 256) * 16
+    np.testing.assert_allclose(
+        _matches(unit, unit, 256, max_bytes=3 * row_bytes), _matches(unit, unit, 256)
+    )
+    # a budget below one row still filters one row at a time
+    np.testing.assert_allclose(
+        _matches(unit, unit, 256, max_bytes=1), _matches(unit, unit, 256)
+    )
@@ -0,0 +1,44 @@
+import numpy as np
+from bilby.core.utils import random
+
+from burst_search_pipeline.lvk_interferometers import load_interferometers
+from burst_search_pipeline.training_data import (
+    BurstType,
+    TrainingData,
+    generate_training_set,
+)
+
+NO_SIGNALS = (0.5, 0.5, 0.0)
+
+
+def test_load_interferometers_rng_matches_bilby():
+    random.seed(5)
+    expected = load_interferometers()
+    ifos = load_interferometers(rng=np.random.default_rng(5))
+    for ifo, ref in zip(ifos, expected):
+        np.testing.assert_array_equal(
+            ifo.strain_data.frequency_domain_strain,
+            ref.strain_data.frequency_domain_strain,
+        )
+
+
+def test_training_set_independent_of_worker_count():
+    strain, labels, _ = generate_training_set(
+        12, seed=3, label_probabilities=NO_SIGNALS, chunk_size=12
+    )
+    pooled_strain, pooled_labels, _ = generate_training_set(
+        12, seed=3, n_workers=3, label_probabilities=NO_SIGNALS, chunk_size=5
+    )
+    assert strain.shape == (12, 2, 256)
+    np.testing.assert_array_equal(labels, pooled_labels)
+    np.testing.assert_array_equal(strain, pooled_strain)
+
+    tail_strain, _, _ = generate_training_set(
+        4, seed=3, label_probabilities=NO_SIGNALS, start=8
+    )
+    np.testing.assert_array_equal(tail_strain, strain[8:])
+
+
+def test_training_data_generate():
+    data = TrainingData(BurstType.GLITCH).generate(seed=1)
+    assert data.time_domain_strain.shape == (2, 256)
@@ -0,0 +1,116 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from burst_search_pipeline.qtransform import QTransformEngine
+from burst_search_pipeline.search.model import Model
+from burst_search_pipeline.training_data import BurstType, write_training_set
+from burst_search_pipeline.training_store import TrainingStore
+
+
+def _batch(start, n):
+    idx = np.arange(start, start + n)
+    return (
+        idx[:, None, None] * np.ones((n, 2, 4)),
+        idx % 3,
+        idx[:, None] * np.ones((n, 1)),
+    )
+
+
+def test_append_and_memory_mapped_reads(tmp_path):
+    store = TrainingStore(
+        str(tmp_path), strain_shape=(2, 4), param_names=["d"], chunk_size=4
+    )
+    store.append(*_batch(0, 6))
+    assert len(store) == 4  # only full chunks are on disk
+    store.flush()
+
+    resumed = TrainingStore(str(tmp_path))
+    assert len(resumed) == 6
+    resumed.append(*_batch(6, 5))
+    resumed.flush()
+    assert len(resumed) == 11
+
+    batch = resumed.read([10, 0, 5, 7], fields=("strain", "labels", "params"))
+    np.testing.assert_array_equal(batch["strain"][:, 0, 0], [10, 0, 5, 7])
+    np.testing.assert_array_equal(batch["params"][:, 0], [10, 0, 5, 7])
+    assert isinstance(resumed.chunk("strain", 0), np.memmap)
+
+    seen = np.concatenate(
+        [y for _, y in resumed.iter_minibatches(3, rng=np.random.default_rng(0))]
+    )
+    assert sorted(seen) == sorted(np.arange(11) % 3)
+    assert len(resumed.sample_minibatch(5)["labels"]) == 5
+    with pytest.raises(IndexError):
+        resumed.read([11])
+
+
+def test_write_training_set_resumes(tmp_path):
+    kwargs = dict(seed=2, label_probabilities=(0.5, 0.5, 0.0), batch_size=3)
+    write_training_set(str(tmp_path / "full"), 7, **kwargs)
+    write_training_set(str(tmp_path / "resumed"), 4, **kwargs)
+    resumed = write_training_set(str(tmp_path / "resumed"), 7, **kwargs)
+    full = TrainingStore(str(tmp_path / "full"))
+    fields = ("strain", "labels")
+    for field in fields:
+        np.testing.assert_array_equal(
+            resumed.read(range(7), fields)[field], full.read(range(7), fields)[field]
+        )
+
+
+def test_reopening_with_other_settings_raises(tmp_path):
+    TrainingStore(
+        str(tmp_path),
+        strain_shape=(2, 4),
+        chunk_size=4,
+        attrs=dict(seed=1, probabilities=(0.5, 0.5)),
+    )
+    TrainingStore(
+        str(tmp_path),
+        strain_shape=(2, 4),
+        chunk_size=4,
+        attrs=dict(probabilities=(0.5, 0.5)),
+    )
+    for kwargs in [
+        dict(strain_shape=(2, 5)),
+        dict(qgram_shape=(2, 3, 3)),
+        dict(param_names=["d"]),
+        dict(chunk_size=8),
+        dict(dtype="float16"),
+        dict(attrs=dict(seed=2)),
+        dict(attrs=dict(probabilities=(0.4, 0.6))),
+    ]:
+        with pytest.raises(ValueError):
+            TrainingStore(str(tmp_path), **kwargs)
+
+    kwargs = dict(seed=2, label_probabilities=(0.5, 0.5, 0.0), batch_size=3)
+    write_training_set(str(tmp_path / "set"), 3, **kwargs)
+    for changed in [
+        dict(seed=3),
+        dict(label_probabilities=(0.6, 0.4, 0.0)),
+        dict(batch_size=4),
+        dict(qgram_engine=QTransformEngine(n_freqs=8, n_times=8)),
+    ]:
+        with pytest.raises(ValueError):
+            write_training_set(str(tmp_path / "set"), 6, **dict(kwargs, **changed))
+    assert len(TrainingStore(str(tmp_path / "set"))) == 3
+
+
+def test_model_fits_from_store(tmp_path):
+    rng = np.random.default_rng(0)
+    strain = rng.normal(size=(1200, 2, 256))
+    labels = np.where(
+        np.arange(1200) % 10, BurstType.NOISE.value, BurstType.GLITCH.value
+    )
+    store = TrainingStore(str(tmp_path), strain_shape=(2, 256), chunk_size=500)
+    with store:
+        store.append(strain, labels)
+
+    batches = partial(store.iter_minibatches, 400, shuffle=False, channels_last=True)
+    X, y = next(batches())
+    assert X.shape == (400, 256, 2)
+    model = Model().fit(batches)
+    expected = Model(batch_size=400).fit(strain.transpose(0, 2, 1), labels)
+    np.testing.assert_allclose(model.mean, expected.mean)
+    np.testing.assert_allclose(model._background_scores, expected._background_scores)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+import starccato
+
+from burst_search_pipeline import waveform_generator
+from burst_search_pipeline.waveform_generator import (
+    N_TIMESTAMPS,
+    SAMPLING_FREQ,
+    WaveformCache,
+    generate_waveforms,
+)
+
+
+def _fake_generate_signals(n=1, seed=0, latent_vector=None, weights_file=None):
+    """Stand-in for the starccato generator: a sine-Gaussian, phase set by the seed"""
+    seeds = np.arange(seed, seed + n) if latent_vector is None else latent_vector[:, 0]
+    t = np.arange(N_TIMESTAMPS) / SAMPLING_FREQ - N_TIMESTAMPS / SAMPLING_FREQ / 2
+    phase = np.asarray(seeds, dtype=float)[:, None]
+    strain = np.sin(2 * np.pi * 300 * t + phase) * np.exp(-((t / 0.005) ** 2))
+    return strain.astype(np.float32)
+
+
+@pytest.fixture(autouse=True)
+def fake_generator(monkeypatch):
+    # the real generator downloads its weights
+    monkeypatch.setattr(starccato, "generate_signals", _fake_generate_signals)
+    monkeypatch.setattr(
+        waveform_generator,
+        "_latent_vectors",
+        lambda seeds: np.asarray(seeds, dtype=float)[:, None],
+    )
+
+
+def test_generate_waveforms_matches_single_calls():
+    seeds, distances = [3, 7, 11], [2, 5, 10]
+    batch = generate_waveforms(seeds, distances)
+    assert batch.time_domain_strain.shape == (3, 256)
+    assert batch.frequency_domain_strain.shape == (3, 129)
+    for i, (seed, d) in enumerate(zip(seeds, distances)):
+        expected = 1e-21 * (10.0 / d) * starccato.generate_signals(n=1, seed=seed)[0]
+        np.testing.assert_allclose(batch.time_domain_strain[i], expected, rtol=1e-6)
+        np.testing.assert_allclose(
+            batch.frequency_domain_strain[i],
+            np.fft.rfft(expected) / SAMPLING_FREQ,
+            rtol=1e-5,
+            atol=1e-30,
+        )
+
+
+def test_waveform_cache_rescales_distance(tmp_path):
+    cache = WaveformCache(cache_dir=str(tmp_path))
+    near = cache.generate_waveforms([1, 2], 2.0)
+    far = cache.generate_waveforms([1, 2], 8.0)
+    assert cache.misses == 2 and cache.hits == 2
+    np.testing.assert_allclose(far.time_domain_strain, near.time_domain_strain / 4)
+    np.testing.assert_allclose(
+        far.frequency_domain_strain,
+        generate_waveforms([1, 2], 8.0).frequency_domain_strain,
+        rtol=1e-6,
+        atol=1e-30,
+    )
+
+    reloaded = WaveformCache(cache_dir=str(tmp_path))
+    reloaded.generate_waveforms([1, 2], 1.0)
+    assert reloaded.misses == 0
+
+
+def test_waveform_cache_evicts_within_max_bytes():
+    entry_nbytes = 256 * 8 + 129 * 16
+    cache = WaveformCache(max_bytes=2 * entry_nbytes)
+    cache.generate_waveforms([1, 2], 1.0)
+    # seed 1 is a hit, so seed 2 is evicted to make room for seed 3
+    batch = cache.generate_waveforms([1, 3], 1.0)
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.hits == 1 and cache.misses == 3
+    np.testing.assert_allclose(
+        batch.time_domain_strain, generate_waveforms([1, 3], 1.0).time_domain_strain
+    )
+
+    cache.generate_waveforms([4, 5, 6, 1], 1.0)
+    assert cache.nbytes <= cache.max_bytes